@@ -8,39 +8,29 @@ Last modified: 2019-03-25 by L. I. Menzies
 """
 
 import csv
-import hashlib
-import io
 import math
-import mimetypes
 import operator
-from os import walk, stat, remove
-from os.path import join, basename, dirname, relpath, isdir
+from functools import partial
+from collections import Counter
+from os import stat, remove, replace
+from os.path import join, basename, dirname, relpath, isdir, isfile
 from time import strftime, localtime
 
-CHUNKSIZE = io.DEFAULT_BUFFER_SIZE
-
-def md5hash(file_name):
-    """ Generate SHA3-256 hashes. """
-    hash_md5 = hashlib.md5()
-    try:
-        with open(file_name, "rb") as md5file:
-            for chunks in iter(lambda: md5file.read(CHUNKSIZE), b""):
-                hash_md5.update(chunks)
-    except OSError:
-        return "OS Error"
-    return hash_md5.hexdigest()
-
-def sha3hash(filname):
-    """ Generate SHA3-256 hashes. """
-    hash_sha3 = hashlib.sha3_256()
-    try:
-        with open(filname, "rb") as sha3file:
-            for chunks in iter(lambda: sha3file.read(CHUNKSIZE), b""):
-                hash_sha3.update(chunks)
-    except OSError:
-        return "OS Error"
-    return hash_sha3.hexdigest()
+from batch_inventory import batch_main, batch_parser, read_roots
+from block_digests import (BLOCK_COLUMNS, BLOCK_SIZE, DEFAULT_FAST, FAST_DIGESTS, block_digests_path, file_digests,
+                           parse_size, write_blocks)
+from checkpoint import (CHECKPOINT_EVERY, checkpoint_path, clear_checkpoint, load_checkpoint,
+                        reopen_inventory, save_checkpoint)
+from dir_digests import write_directory_digests
+from estimate import SAMPLE_FILES, estimate_inventory
+from file_deadlines import RETRIES, Deadline, FileStuck, Quarantine
+from inventory_io import COMPRESSIONS, InventoryWriter, zstd_available
+from io_scheduler import ORDERS, parse_limits, schedule
+from shards import SHARD_MODES, parse_shard, shard_name, shard_of
+from throttle import add_throttle_arguments, throttle_from_args
+from walk_filters import WalkFilter, add_filter_arguments, filter_from_args
 
+SCHEDULE_BATCH = 10000  # Files stat'ed during the walk before they are handed to the hash workers
 
 def convert_size(size):
     """ Make file sizes human readable. """
@@ -56,92 +46,372 @@ def convert_size(size):
     return '%s%s' % (s, size_name[i])
 
 
-def run_inventory(indir, outdir):
-    """ Run the inventory and output as Inv_<name>_<datetime>.csv. """
+def hash_file(filepathname, block_size=0, throttle=None, fast=None, strict=False, limit=0):
+    """ Hash one file in a single read, noting when the hashes finished. With a
+    block_size, files larger than one block also get a digest per block, and with
+    a fast algorithm, a fast digest. Reads are paced by the throttle, if there is
+    one. With strict, an OSError is raised rather than recorded as 'OS Error'.
+    With a limit, only the first limit bytes are hashed. """
+    md5sum, sha3sum, blocks, fastsum = file_digests(filepathname, block_size, throttle, fast, strict, limit)
+    hashtime = strftime("%Y.%m.%d %H:%M:%S")
+    return md5sum, hashtime, sha3sum, hashtime, blocks, fastsum
+
+
+def unreadable(err=None, fast=None):
+    """ The hashes recorded for a file that could not be read. """
+    hashtime = strftime("%Y.%m.%d %H:%M:%S")
+    return 'OS Error', hashtime, 'OS Error', hashtime, [], 'OS Error' if fast else ''
+
+
+def guess_mime(filepathname):
+    """ Guess the MIME type of a file from its name. mimetypes is imported on the
+    first call rather than at startup, as it is slow to load and only runs that
+    write rows need it. """
+    import mimetypes
+    return str(mimetypes.guess_type(filepathname)[0])
+
+
+def inventory_row(rownum, filepathname, statinfo, indir, hashes):
+    """ Build the inventory row for one file from its stat info and hashes. """
+    md5sum, md5time, sha3sum, sha3time = hashes[:4]
+    filesize = statinfo[6]
+    csize = convert_size(filesize)
+    filemime = guess_mime(filepathname)
+    filectime = strftime("%Y.%m.%d %H:%M:%S",
+                         localtime(statinfo.st_ctime))
+    # Note: On Windows, ctime is "date created" but on Unix it is
+    # "change time", i.e. the last time the metadata was changed.
+    modifdate = strftime("%Y.%m.%d %H:%M:%S",
+                         localtime(statinfo.st_mtime))
+    accessdate = strftime("%Y.%m.%d %H:%M:%S",
+                          localtime(statinfo.st_atime))
+    filemode = str(statinfo.st_mode)
+    fileino = str(statinfo.st_ino)
+    filedevice = str(statinfo.st_dev)
+    filenlink = str(statinfo.st_nlink)
+    fileuser = str(statinfo.st_uid)
+    filegroup = str(statinfo.st_gid)
+    showpath = relpath(filepathname, dirname(indir))
+    return [str(rownum), basename(filepathname), showpath, csize, filemime, filectime,
+            modifdate, accessdate, md5sum, md5time, sha3sum,
+            sha3time, ' ', filemode, fileino, filedevice,
+            filenlink, fileuser, filegroup]
+
+
+def extra_columns(hashes, link_of, fast, mark_links):
+    """ The optional FastDigest and LinkOf cells of a row. """
+    return ([hashes[5]] if fast else []) + ([link_of] if mark_links else [])
+
+
+def run_inventory(indir, outdir, progress=True, hash_workers=1, order='inode', concurrency=None,
+                  resume=False, checkpoint_every=CHECKPOINT_EVERY, shard=None, shard_by='top', block_size=0,
+                  throttle=None, fast=None, mark_links=False, walk_filter=None, file_timeout=None,
+                  retries=RETRIES, slots=None):
+    """ Run the inventory and output as Inv_<name>_<datetime>.csv. With more than
+    one hash worker, files are stat'ed during the walk and handed to the per-device
+    scheduler SCHEDULE_BATCH at a time, so rows are written as the walk goes.
+    Progress is checkpointed as rows are written; with resume, the run continues
+    from the last checkpoint and skips files already inventoried. A (K, N) shard
+    inventories only the files in shard K of N, split by top-level name or by the
+    hash of each path. With a block_size, the block
+    digests of large files go to a BlockDigests csv next to the inventory. A
+    throttle paces the reads of every hash worker (and of every root, in batch
+    mode, when they share it). A fast algorithm adds a FastDigest column. A file
+    with several hard links is hashed once: the other paths to the same inode reuse
+    its digests, and with mark_links a LinkOf column gives the path they came from.
+    Files and directories are skipped by the rules of walk_filter (by default
+    .DS_Store, Thumbs.db, AppleDouble files and @eaDir directories). Reads that
+    fail with a transient error are retried up to retries times. With a
+    file_timeout, a read that makes no progress for that many seconds is set
+    aside in a quarantine and retried once every other file is done; what became
+    of those files is written to a Quarantine csv. Shared io_scheduler.ReadSlots
+    limit the reads of this and other runs together. """
     filecounter = 0
-    dsstore_count = 0
-    inv_path = join(outdir, f'Inventory{strftime("%Y%b%d_%H%M%S")}temp.csv')
-    inventory = open(inv_path, 'w')
+    walk_filter = walk_filter or WalkFilter()
+    skipped = Counter()  # Files and directories left out, by rule
+    jobs = []
+    done = set()
+    links = {}  # (device, inode): (RelPath, hashes) of the first path hashed, for files with several links
+    followers = {}  # (device, inode): other paths to a file queued for the hash workers or quarantined
+    inv_name = shard_name(indir, shard)
+    ckpt = load_checkpoint(indir, outdir, inv_name) if resume else None
+    if ckpt:
+        inventory, done, links = reopen_inventory(ckpt)
+        inv_path = ckpt['temp']
+        filecounter = ckpt['rows']
+        print(f'Resuming from checkpoint: {filecounter} files already inventoried.')
+    else:
+        inv_path = join(outdir, f'Inventory_{inv_name}_{strftime("%Y%b%d_%H%M%S")}temp.csv')
+        inventory = open(inv_path, 'w')
     colnames = ['No.', 'Filename', 'RelPath', 'Filesize', 'Filetype', 'C-Time',
                 'Modified', 'Accessed', 'MD5', 'MD5-Time', 'SHA3_256',
                 'SHA3-Time','=>', 'mode', 'inode', 'device',
                 'enlink', 'user', 'group']
+    if fast:
+        colnames.append('FastDigest')
+    if mark_links:
+        colnames.append('LinkOf')
     writeCSV = csv.writer(inventory)
-    writeCSV.writerow(colnames)
-    for base, dirs, files in walk(indir):
+    if not ckpt:
+        writeCSV.writerow(colnames)
+    hasher = Deadline(partial(hash_file, block_size=block_size, fast=fast), partial(unreadable, fast=fast),
+                      file_timeout, throttle, retries)
+    quarantine = Quarantine(hasher)
+    if block_size:
+        resumed_blocks = ckpt and 'blocks' in ckpt
+        blocks_file = open(block_digests_path(inv_path), 'a' if resumed_blocks else 'w')
+        writeBlocks = csv.writer(blocks_file)
+        if not resumed_blocks:
+            writeBlocks.writerow(BLOCK_COLUMNS)
+    reused = 0
+    avoided = 0  # Bytes not read thanks to hard links
+
+    def write_file(filepathname, statinfo, hashes, link_of=''):
+        """ Write the row of one file, and checkpoint every checkpoint_every rows. """
+        nonlocal filecounter, reused, avoided
+        filecounter += 1
+        row = inventory_row(filecounter, filepathname, statinfo, indir, hashes)
+        writeCSV.writerow(row + extra_columns(hashes, link_of, fast, mark_links))
+        if hashes[4]:
+            write_blocks(writeBlocks, relpath(filepathname, dirname(indir)), hashes[4])
+        if link_of:
+            reused += 1
+            avoided += statinfo.st_size
+        if filecounter % checkpoint_every == 0:
+            save_checkpoint(inventory, inv_path, indir, outdir, filecounter, inv_name,
+                            blocks_file if block_size else None)
+        if progress:
+            print(f'\rProgress: {filecounter} Files', end='')
+
+    def write_hashed(job, hashes):
+        """ Write a hashed file and, with the same digests, the other links to it
+        that turned up while it was queued or quarantined. Later links reuse them too.
+        If the file couldn't be read, neither can its links: they get the same
+        OS Error digests, but no LinkOf, and are reported with the quarantine. """
+        write_file(job[0], job[1], hashes)
+        link_key = (job[1].st_dev, job[1].st_ino)
+        link_of = relpath(job[0], dirname(indir))
+        link_jobs = followers.pop(link_key, [])
+        if hashes[0] == 'OS Error':
+            link_of = ''
+            quarantine.hold_links(job, link_jobs)
+        for filepathname, statinfo in link_jobs:
+            write_file(filepathname, statinfo, hashes, link_of)
+        if job[1].st_nlink > 1 and hashes[0] != 'OS Error':
+            links[link_key] = (link_of, hashes)
+
+    def write_results(results):
+        """ Write the (job, hashes, error) results of the scheduler or of the
+        quarantine's retries. Files that got stuck the first time are held back. """
+        for job, hashes, error in results:
+            if isinstance(error, FileStuck):
+                if quarantine.hold(job):
+                    continue
+                hashes = unreadable(error, fast)
+            elif error is not None:
+                raise error
+            write_hashed(job, hashes)
+
+    for base, dirs, files in walk_filter.walk(indir, skipped):
+        if shard and shard_by == 'top' and base == indir:
+            dirs[:] = [d for d in dirs if shard_of(d, shard[1]) == shard[0]]
+            files = [f for f in files if shard_of(f, shard[1]) == shard[0]]
         for name in files:
             filepathname = join(base, name)
-            # Ignore or delete .DS_Store Files
-            if basename(filepathname) == '.DS_Store':
-                # remove(filepathname)
-                dsstore_count += 1
-            elif not basename(filepathname) == '.DS_Store':
-                filecounter += 1
-                rownum = str(filecounter)
-                statinfo = stat(filepathname)
-                filesize = statinfo[6]
-                csize = convert_size(filesize)
-                filemime = str(mimetypes.guess_type(filepathname)[0])
-                filectime = strftime("%Y.%m.%d %H:%M:%S",
-                                     localtime(statinfo.st_ctime))
-                # Note: On Windows, ctime is "date created" but on Unix it is
-                # "change time", i.e. the last time the metadata was changed.
-                modifdate = strftime("%Y.%m.%d %H:%M:%S",
-                                     localtime(statinfo.st_mtime))
-                accessdate = strftime("%Y.%m.%d %H:%M:%S",
-                                      localtime(statinfo.st_atime))
-                md5sum = md5hash(filepathname)
-                md5time = strftime("%Y.%m.%d %H:%M:%S")
-                sha3sum = sha3hash(filepathname)
-                sha3time = strftime("%Y.%m.%d %H:%M:%S")
-                filemode = str(statinfo.st_mode)
-                fileino = str(statinfo.st_ino)
-                filedevice = str(statinfo.st_dev)
-                filenlink = str(statinfo.st_nlink)
-                fileuser = str(statinfo.st_uid)
-                filegroup = str(statinfo.st_gid)
-                showpath = relpath(filepathname, dirname(indir))
-                newrow = [rownum, name, showpath, csize, filemime, filectime,
-                            modifdate, accessdate, md5sum, md5time, sha3sum,
-                            sha3time, ' ', filemode, fileino, filedevice,
-                            filenlink, fileuser, filegroup]
-                writeCSV.writerow(newrow)
-                print(f'\rProgress: {filecounter} Files', end='')
+            if done and relpath(filepathname, dirname(indir)) in done:
+                continue
+            if shard and shard_by == 'hash' and shard_of(relpath(filepathname, indir), shard[1]) != shard[0]:
+                continue
+            statinfo = stat(filepathname)
+            link_key = (statinfo.st_dev, statinfo.st_ino) if statinfo.st_nlink > 1 else None
+            if link_key in links:
+                write_file(filepathname, statinfo, links[link_key][1], links[link_key][0])
+                continue
+            if link_key in followers:  # Queued for the hash workers, or set aside as stuck
+                followers[link_key].append((filepathname, statinfo))
+                continue
+            if link_key:
+                followers[link_key] = []
+            if hash_workers > 1:
+                # Hashed a batch at a time, so rows (and checkpoints) are written during the walk
+                jobs.append((filepathname, statinfo))
+                if len(jobs) >= SCHEDULE_BATCH:
+                    write_results(schedule(hasher, jobs, hash_workers, concurrency, order, slots))
+                    jobs = []
+                continue
+            try:
+                hashes = hasher(filepathname)
+            except FileStuck:
+                quarantine.hold((filepathname, statinfo))  # Other links wait for it, rather than getting stuck too
+                continue
+            write_hashed((filepathname, statinfo), hashes)
+    if jobs:
+        write_results(schedule(hasher, jobs, hash_workers, concurrency, order, slots))
+    # Files that got stuck come round again once everything else is done
+    write_results(quarantine.retry())
     inventory.close()
-    if dsstore_count > 0:
-        print(f'\nSkipped {dsstore_count} \'.DS_Store\' files.\n')
+    if block_size:
+        blocks_file.close()
+    clear_checkpoint(indir, outdir, inv_name)
+    if quarantine.jobs:
+        print(f'\n{indir}: {quarantine.summary(quarantine.write_report(indir, outdir, inv_name))}\n')
+    if skipped:
+        print('\n' + '\n'.join(walk_filter.report(skipped)) + '\n')
+    if reused:
+        print(f'\n{indir}: reused the digests of {reused} hard-linked files, avoiding {convert_size(avoided)} '
+              f'of reads.\n')
     return inv_path
 
 
-def sort_inventory(unsorted_file, in_dir):
+def sort_inventory(unsorted_file, in_dir, shard=None, compression=None, part_rows=0):
+    """ Sort the inventory by RelPath and number its rows. The sorted inventory is
+    compressed if a compression is given, and split into parts of part_rows rows,
+    listed in an index, if part_rows is given. Returns the path of the inventory,
+    or of its index. """
     print(f'Sorting Data... ')
-    output_path = join(dirname(unsorted_file), f'Inventory_{basename(in_dir)}_{strftime("%Y%b%d_%H%M%S")}.csv')
+    output_path = join(dirname(unsorted_file), f'Inventory_{shard_name(in_dir, shard)}_{strftime("%Y%b%d_%H%M%S")}.csv')
     with open(unsorted_file, 'r') as un_csv:
         reading = csv.DictReader(un_csv)
         headers = reading.fieldnames
         sorted_data = sorted(reading, key=lambda row: row['RelPath'], reverse=False)
-    with open(output_path, 'w') as out_csv:
-        writing = csv.DictWriter(out_csv, fieldnames=headers)
-        writing.writeheader()
-        n = 1
-        for rrows in sorted_data:
-            rrows['No.'] = str(n)
-            n += 1
-            writing.writerow(rrows)
+    writing = InventoryWriter(output_path, headers, compression, part_rows)
+    n = 1
+    for rrows in sorted_data:
+        rrows['No.'] = str(n)
+        n += 1
+        writing.writerow(rrows)
+    inventory_path = writing.close()
     remove(unsorted_file)
+    if isfile(block_digests_path(unsorted_file)):
+        replace(block_digests_path(unsorted_file), block_digests_path(output_path))
+    return inventory_path
+
+
+def sort_with_digests(unsorted_file, in_dir, shard=None, compression=None, part_rows=0):
+    """ Sort the inventory, then write its directory digests alongside it. """
+    output_path = sort_inventory(unsorted_file, in_dir, shard, compression, part_rows)
+    write_directory_digests(output_path)
     return output_path
 
 
+def print_estimate(indir, report):
+    """ Print an estimate from estimate_inventory in a readable form. """
+    seconds = int(report['projected_seconds'])
+    runtime = f'{seconds // 3600}h {seconds % 3600 // 60}m {seconds % 60}s'
+    approx = 'About ' if report['sampled_dirs'] else ''
+    print(f'----- {indir} -----\n'
+          f'{approx}{report["files"]} files, {convert_size(report["bytes"])}\n'
+          f'Hashed {report["sampled_files"]} sample files ({convert_size(report["sampled_bytes"])}) '
+          f'in {report["hash_seconds"]:.2f}s\n'
+          f'Projected inventory time: {runtime}')
+    for label, counts in (('File types', report['mimes']), ('Extensions', report['extensions'])):
+        print(f'{label}:')
+        for kind, count in counts.most_common(10):
+            print(f'    {kind}: {round(count)}')
+    for line in WalkFilter.report(report['skipped']):
+        print(line)
+
+
 def main():
+    parser = batch_parser("Inventory the files in one or more directories. Run without arguments to be "
+                          "prompted for a single input and output path.")
+    parser.add_argument('--hash-workers', type=int, default=1,
+                        help="Number of files hashed at once within each root (default: 1)")
+    parser.add_argument('--order', choices=ORDERS, default='inode',
+                        help="Order in which files on one device are hashed (default: inode)")
+    parser.add_argument('--device-limit', action='append', metavar='KIND=N',
+                        help="Files read at once per device of a kind: rotational, ssd, network or unknown")
+    parser.add_argument('--dir-digests', action='store_true',
+                        help="Also write a DirDigests csv of per-directory rollup digests for each inventory")
+    parser.add_argument('--fast-digest', nargs='?', choices=sorted(FAST_DIGESTS), const=DEFAULT_FAST, metavar='ALG',
+                        help=f"Also record a fast digest, for audit_inventory.py --fast. It is computed in the same "
+                             f"pass as MD5 and SHA3-256, which makes inventories a little slower "
+                             f"({', '.join(sorted(FAST_DIGESTS))}; default: {DEFAULT_FAST})")
+    parser.add_argument('--mark-links', action='store_true',
+                        help="Add a LinkOf column giving, for each extra hard link to a file, the path whose digests "
+                             "it reuses")
+    parser.add_argument('--file-timeout', type=float, metavar='SECONDS',
+                        help="Set aside any file whose read makes no progress for SECONDS, carry on with the rest, "
+                             "and retry the files set aside at the end of the run")
+    parser.add_argument('--retries', type=int, default=RETRIES,
+                        help=f"Times a read that fails with a transient error (EIO, ESTALE, ...) is retried, with a "
+                             f"pause that doubles from 1 second (default: {RETRIES})")
+    add_throttle_arguments(parser)
+    add_filter_arguments(parser)
+    parser.add_argument('--block-digests', nargs='?', type=parse_size, const=BLOCK_SIZE, default=0, metavar='SIZE',
+                        help="Also write a BlockDigests csv with a digest per SIZE block (default: 64M) of each larger "
+                             "file, for verify_blocks.py")
+    parser.add_argument('--compress', choices=sorted(COMPRESSIONS),
+                        help="Compress the sorted inventory with gzip, or zstd if the zstandard module is installed")
+    parser.add_argument('--part-rows', type=int, default=0, metavar='N',
+                        help="Split the sorted inventory into parts of N rows, listed in an index csv")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue interrupted runs from their last checkpoint")
+    parser.add_argument('--checkpoint-every', type=int, default=CHECKPOINT_EVERY,
+                        help=f"Files inventoried between checkpoints (default: {CHECKPOINT_EVERY})")
+    parser.add_argument('--estimate', action='store_true',
+                        help="Only estimate file count, size, file types and runtime; nothing is written")
+    parser.add_argument('--sample-dirs', type=float, default=1.0, metavar='FRACTION',
+                        help="With --estimate, visit only this fraction of subdirectories (default: 1.0)")
+    parser.add_argument('--sample-files', type=int, default=SAMPLE_FILES,
+                        help=f"With --estimate, files hashed to measure throughput (default: {SAMPLE_FILES})")
+    parser.add_argument('--shard', metavar='K/N',
+                        help="Inventory only shard K of N; combine the partial outputs with merge_inventories.py")
+    parser.add_argument('--shard-by', choices=SHARD_MODES, default='top',
+                        help="Split shards by top-level file or directory name, or by the hash of each path "
+                             "(default: top)")
+    args = parser.parse_intermixed_args()
+    try:
+        limits = parse_limits(args.device_limit)
+        shard = parse_shard(args.shard) if args.shard else None
+    except ValueError as err:
+        parser.error(str(err))
+    if args.checkpoint_every < 1:
+        parser.error('--checkpoint-every must be at least 1')
+    if not 0 < args.sample_dirs <= 1:
+        parser.error('--sample-dirs must be greater than 0 and at most 1')
+    if args.part_rows < 0:
+        parser.error('--part-rows must not be negative')
+    if args.file_timeout is not None and args.file_timeout <= 0:
+        parser.error('--file-timeout must be greater than 0')
+    if args.retries < 0:
+        parser.error('--retries must not be negative')
+    if args.compress == 'zstd' and not zstd_available():
+        parser.error('--compress zstd needs the zstandard module (pip3 install zstandard)')
+    walk_filter = filter_from_args(args)
+    if args.estimate:
+        for root in read_roots(args.roots, args.roots_file):
+            if isdir(root):
+                print_estimate(root, estimate_inventory(root, hash_file, args.sample_dirs, args.sample_files,
+                                                        walk_filter=walk_filter))
+            else:
+                print(f'Error: Could not find the input directory:\n    \'{root}\'')
+        return
+    if args.roots or args.roots_file:
+        throttle = throttle_from_args(args)
+        sorter = partial(sort_with_digests if args.dir_digests else sort_inventory, shard=shard,
+                         compression=args.compress, part_rows=args.part_rows)
+        batch_main(args, run_inventory, sorter, hash_workers=args.hash_workers, order=args.order,
+                   concurrency=limits, resume=args.resume, checkpoint_every=args.checkpoint_every,
+                   shard=shard, shard_by=args.shard_by, block_size=args.block_digests, throttle=throttle,
+                   fast=args.fast_digest, mark_links=args.mark_links, walk_filter=walk_filter,
+                   file_timeout=args.file_timeout, retries=args.retries)
+        if throttle:
+            print(throttle.summary())
+        return
     print('What is the path to the directory to be inventoried (Do not include final slash)? ')
     invpath = input('Input Path: ')
     print('What is the path to the directory where the results will be stored (Do not include final slash)? ')
     outputdir = input('Output Path: ')
     print('\n')
     if not isdir(invpath) or not isdir(outputdir):
-        print(f'Error: Could not find the input directory:\n    \'{invpath}\'\nor output directory:\n    \'{workdir}\'\nQuitting...')
+        print(f'Error: Could not find the input directory:\n    \'{invpath}\'\nor output directory:\n    \'{outputdir}\'\nQuitting...')
     else:
-        temp_inv = run_inventory(invpath, outputdir)
+        resume = False
+        if isfile(checkpoint_path(invpath, outputdir)):
+            print('A previous inventory of this directory was interrupted. Resume it (y/n)? ')
+            resume = input('Resume: ').strip().lower().startswith('y')
+        temp_inv = run_inventory(invpath, outputdir, resume=resume)
         inventory_sorted = sort_inventory(temp_inv, invpath)
         print(f'\nOutput File: {inventory_sorted}')
     print('\nDone.\n')
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+"""Fixity audit: re-verifies the files listed in an existing inventory against the disk without writing a new
+inventory. Files are rehashed in parallel through the per-device scheduler, in inode order on each device, and
+only the discrepancies are written to an Audit_<name>_<datetime>.csv report. --rate and --file-rate cap the reads
+so an audit can run on production storage. With --fast, an inventory that has a FastDigest column is checked
+against it first, and only files whose fast digest differs are hashed with MD5 and SHA3-256.
+"""
+
+import argparse
+import csv
+from os import sep, stat
+from os.path import basename, isdir, isfile, join
+from time import monotonic, strftime
+
+from block_digests import FAST_DIGESTS, fast_file_digest, file_digests
+from inventory_io import read_inventory
+from io_scheduler import ORDERS, parse_limits, schedule
+from throttle import add_throttle_arguments, throttle_from_args
+
+AUDIT_COLUMNS = ['RelPath', 'Problem', 'Inventory MD5', 'Found MD5', 'Inventory SHA3_256', 'Found SHA3_256']
+
+
+def audit_inventory(inventory_csv, root, outdir, workers=4, order='inode', concurrency=None, throttle=None,
+                    fast_first=False):
+    """Rehashes every file of inventory_csv found under root, and writes the ones that are missing, unreadable or
+    changed to the audit report. Returns the report path, the number of files checked, the number of
+    discrepancies and the bytes read.
+    """
+    expected = {}  # Path on disk: (RelPath, MD5, SHA3_256, FastDigest)
+
+    def check_file(filepathname):
+        """MD5 and SHA3-256 of a file, or the ones in the inventory if its fast digest still matches."""
+        relpath, md5sum, sha3sum, fastsum = expected[filepathname]
+        algorithm = fastsum.partition(':')[0]
+        if fast_first and algorithm in FAST_DIGESTS:
+            if fast_file_digest(filepathname, algorithm, throttle) == fastsum:
+                return md5sum, sha3sum
+        return file_digests(filepathname, throttle=throttle)[:2]
+
+    jobs = []
+    report_path = join(outdir, f'Audit_{basename(root)}_{strftime("%Y%b%d_%H%M%S")}.csv')
+    checked = 0
+    problems = 0
+    bytes_read = 0
+    with open(report_path, 'w', newline='') as out_csv:
+        report = csv.writer(out_csv)
+        report.writerow(AUDIT_COLUMNS)
+        for row in read_inventory(inventory_csv):
+            checked += 1
+            # RelPath starts with the name of the inventoried directory
+            filepathname = join(root, row['RelPath'].partition(sep)[2])
+            try:
+                statinfo = stat(filepathname)
+            except OSError:
+                problems += 1
+                report.writerow([row['RelPath'], 'Missing', row['MD5'], '', row['SHA3_256'], ''])
+                continue
+            expected[filepathname] = (row['RelPath'], row['MD5'], row['SHA3_256'], row.get('FastDigest') or '')
+            jobs.append((filepathname, statinfo))
+        for job, digests, error in schedule(check_file, jobs, workers, concurrency, order):
+            relpath, md5sum, sha3sum, _ = expected.pop(job[0])
+            found_md5, found_sha3 = (digests[0], digests[1]) if error is None else ('OS Error', 'OS Error')
+            if found_md5 == 'OS Error':
+                problem = 'Unreadable'
+            else:
+                bytes_read += job[1].st_size
+                if found_md5 == md5sum and found_sha3 == sha3sum:
+                    continue
+                problem = 'Changed'
+            problems += 1
+            report.writerow([relpath, problem, md5sum, found_md5, sha3sum, found_sha3])
+    return report_path, checked, problems, bytes_read
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify the files in an existing inventory against the disk and "
+                                                 "report only the ones that are missing or have changed.")
+    parser.add_argument("inventory", help="Path to an Inventory_<name>_<datetime>.csv (compressed, or the index "
+                                          "of a split inventory)")
+    parser.add_argument("root", help="Path to the inventoried directory as it is now")
+    parser.add_argument("-o", '--output', help="Path to directory where the audit report will be placed",
+                        required=True)
+    parser.add_argument("-w", '--workers', type=int, default=4, help="Number of files hashed at once (default: 4)")
+    parser.add_argument('--order', choices=ORDERS, default='inode',
+                        help="Order in which files on one device are hashed (default: inode)")
+    parser.add_argument('--device-limit', action='append', metavar='KIND=N',
+                        help="Files read at once per device of a kind: rotational, ssd, network or unknown")
+    parser.add_argument('--fast', action='store_true',
+                        help="Check files against the inventory's FastDigest column first, and hash only the ones "
+                             "that differ with MD5 and SHA3-256")
+    add_throttle_arguments(parser)
+    args = parser.parse_args()
+    try:
+        limits = parse_limits(args.device_limit)
+    except ValueError as err:
+        parser.error(str(err))
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if not isfile(args.inventory) or not isdir(args.root) or not isdir(args.output):
+        print('There was an error with your input.')
+        return
+    throttle = throttle_from_args(args)
+    started = monotonic()
+    report_path, checked, problems, bytes_read = audit_inventory(args.inventory, args.root, args.output,
+                                                                 args.workers, args.order, limits, throttle,
+                                                                 args.fast)
+    elapsed = monotonic() - started
+    print(f'Checked {checked} files ({bytes_read / 2 ** 20:.1f} MiB read in {elapsed:.1f}s, '
+          f'{bytes_read / 2 ** 20 / max(elapsed, 1e-9):.1f} MiB/s).\n'
+          f'{problems} discrepancies.\nReport: {report_path}')
+    if throttle:
+        print(throttle.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""Non-interactive batch mode shared by CLIinventory.py and InventoryOnlyTars.py.
+Inventories many root directories concurrently, writes one inventory per root and
+a combined index of the outputs.
+"""
+
+import argparse
+import csv
+from collections import Counter
+from os import stat
+from os.path import basename, isdir, join, normpath
+from time import strftime
+
+from io_scheduler import ReadSlots, schedule
+
+DEFAULT_WORKERS = 4
+
+
+def batch_parser(description):
+    """Builds the argument parser used by both inventory scripts."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("roots", nargs='*', help="Paths to the directories to be inventoried")
+    parser.add_argument("-f", '--roots-file', help="Path to a text file listing one directory per line")
+    parser.add_argument("-o", '--output', help="Path to directory where the inventories will be placed")
+    parser.add_argument("-w", '--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"Maximum number of roots inventoried at once (default: {DEFAULT_WORKERS})")
+    return parser
+
+
+def read_roots(roots, roots_file=None):
+    """Combines the roots given on the command line with those listed in a roots file. Blank lines and lines
+    starting with '#' are ignored.
+    """
+    all_roots = list(roots)
+    if roots_file:
+        with open(roots_file, 'r') as listing:
+            for line in listing:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    all_roots.append(line)
+    return [normpath(r) for r in all_roots]
+
+
+def run_batch(roots, outdir, run_inventory, sort_inventory, workers=DEFAULT_WORKERS, **options):
+    """Inventories every root. Roots are scheduled per device, so each physical device gets its own set of
+    workers, and no more than `workers` roots run at once overall. Extra options are passed on to
+    run_inventory; any per-device concurrency limits among them also apply to the roots. With several hash
+    workers, the roots share them: hash_workers caps the files read at once over all roots, and each device
+    its limit, however many roots are on it. Returns one result dictionary per root, in the order the roots
+    were given.
+    """
+    limits = options.get('concurrency')
+    if options.get('hash_workers', 1) > 1:
+        options['slots'] = ReadSlots(options['hash_workers'], limits)
+
+    def inventory_root(root):
+        temp_inv = run_inventory(root, outdir, progress=False, **options)
+        return sort_inventory(temp_inv, root)
+
+    results = {}
+    jobs = [(root, stat(root)) for root in roots]
+    for (root, statinfo), output, error in schedule(inventory_root, jobs, workers, limits, order='none'):
+        status = 'Done' if error is None else f'Error: {error}'
+        print(f'{status}: {root}')
+        results[root] = {'Root': root, 'Device': str(statinfo.st_dev), 'Output': output or '', 'Status': status}
+    return [results[root] for root in roots]
+
+
+def write_index(results, outdir, shard=None):
+    """Writes the combined index listing the inventory produced for each root."""
+    label = f'shard{shard[0]}of{shard[1]}_' if shard else ''
+    index_path = join(outdir, f'Inventory_Index_{label}{strftime("%Y%b%d_%H%M%S")}.csv')
+    with open(index_path, 'w', newline='') as index_csv:
+        writing = csv.DictWriter(index_csv, fieldnames=['Root', 'Device', 'Output', 'Status'])
+        writing.writeheader()
+        writing.writerows(results)
+    return index_path
+
+
+def batch_main(args, run_inventory, sort_inventory, **options):
+    """Runs batch mode from parsed command-line arguments. Extra options are passed on to run_batch."""
+    roots = read_roots(args.roots, args.roots_file)
+    missing = [r for r in roots if not isdir(r)]
+    duplicates = sorted(n for n, count in Counter(basename(r) for r in roots).items() if count > 1)
+    if not args.output or not isdir(args.output):
+        print(f'Error: Could not find the output directory:\n    \'{args.output}\'\nQuitting...')
+    elif missing:
+        print('Error: Could not find the input directories:\n    ' + '\n    '.join(missing) + '\nQuitting...')
+    elif duplicates:
+        print('Error: More than one root has the name:\n    ' + '\n    '.join(duplicates) +
+              '\nInventory them into separate output directories.\nQuitting...')
+    elif args.workers < 1:
+        print('Error: The number of workers must be at least 1.\nQuitting...')
+    else:
+        results = run_batch(roots, args.output, run_inventory, sort_inventory, args.workers, **options)
+        index_path = write_index(results, args.output, options.get('shard'))
+        failed = sum(1 for r in results if r['Status'] != 'Done')
+        print(f'\nInventoried {len(results) - failed} of {len(results)} directories.')
+        print(f'Index File: {index_path}')
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+"""Benchmark of the CPU cost of each digest algorithm, in CPU seconds per TB hashed. The data is hashed from
+memory, so the figures leave out disk reads and show how much of a run each algorithm would spend computing.
+xxHash is only measured if the xxhash module is installed.
+"""
+
+import argparse
+import hashlib
+import zlib
+from os import urandom
+from time import process_time
+
+from block_digests import FAST_DIGESTS
+
+TB = 2 ** 40
+
+
+class Checksum:
+    """Wraps zlib.crc32 or zlib.adler32 in the update() interface of hashlib."""
+
+    def __init__(self, function):
+        self.function = function
+        self.value = function(b'')
+
+    def update(self, data):
+        self.value = self.function(data, self.value)
+
+
+class Combined:
+    """MD5 and SHA3-256 in one pass, as the inventory computes them."""
+
+    def __init__(self):
+        self.digests = (hashlib.md5(), hashlib.sha3_256())
+
+    def update(self, data):
+        for digest in self.digests:
+            digest.update(data)
+
+
+def algorithms():
+    """Name and constructor of every algorithm to measure."""
+    measured = {name: getattr(hashlib, name) for name in ('md5', 'sha1', 'sha256', 'sha3_256', 'blake2b', 'blake2s')}
+    measured['crc32'] = lambda: Checksum(zlib.crc32)
+    measured['adler32'] = lambda: Checksum(zlib.adler32)
+    for name, constructor in FAST_DIGESTS.items():
+        measured[f'fast {name}'] = constructor
+    measured['md5+sha3_256'] = Combined
+    return measured
+
+
+def cpu_seconds(constructor, chunk, total):
+    """CPU seconds taken to hash total bytes in chunks."""
+    started = process_time()
+    digest = constructor()
+    for _ in range(total // len(chunk)):
+        digest.update(chunk)
+    return process_time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the CPU seconds per TB of each digest algorithm.")
+    parser.add_argument("-s", '--size', type=int, default=512, help="MiB hashed per run (default: 512)")
+    parser.add_argument("-r", '--repeat', type=int, default=3, help="Runs of each algorithm (default: 3)")
+    args = parser.parse_args()
+    chunk = urandom(2 ** 20)
+    total = args.size * 2 ** 20
+    print(f'{args.size} MiB per run, best of {args.repeat}')
+    for name, constructor in algorithms().items():
+        best = min(cpu_seconds(constructor, chunk, total) for _ in range(args.repeat))
+        print(f'{name:>14}: {best * TB / total:8.0f} CPU s/TB ({total / 2 ** 20 / max(best, 1e-9):7.0f} MiB/s)')
+
+
+if __name__ == "__main__":
+    main()
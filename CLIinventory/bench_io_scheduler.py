@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+"""Benchmark of the per-device scheduler against a naive thread pool, hashing every file in a directory.
+For meaningful numbers on spinning disks, drop the page cache between runs (as root on Linux:
+`sync; echo 3 > /proc/sys/vm/drop_caches`) or point each run at a tree larger than memory.
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from os import stat, walk
+from os.path import isdir, join
+from time import perf_counter
+
+from CLIinventory import convert_size, hash_file
+from io_scheduler import ORDERS, schedule
+
+
+def list_jobs(indir):
+    """Returns (path, statinfo) for every file in walk order."""
+    return [(join(base, name), stat(join(base, name))) for base, dirs, files in walk(indir) for name in files]
+
+
+def naive_pool(jobs, workers):
+    """Hashes in walk order with a plain thread pool, ignoring devices."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(hash_file, [job[0] for job in jobs]))
+
+
+def scheduled(jobs, workers, order):
+    """Hashes with the per-device scheduler."""
+    for job, hashes, error in schedule(hash_file, jobs, workers, order=order):
+        if error is not None:
+            raise error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare naive pooled hashing with per-device scheduling.")
+    parser.add_argument("dir_path", help="Path to a directory of files to hash")
+    parser.add_argument("-w", '--workers', type=int, default=4, help="Number of hash workers (default: 4)")
+    parser.add_argument('--order', choices=ORDERS, default='inode', help="Scheduler order (default: inode)")
+    parser.add_argument("-r", '--repeat', type=int, default=3, help="Runs of each method (default: 3)")
+    args = parser.parse_args()
+    if not isdir(args.dir_path):
+        print('Error. Folder not found.')
+        return
+    jobs = list_jobs(args.dir_path)
+    total = sum(job[1].st_size for job in jobs)
+    print(f'{len(jobs)} files, {convert_size(total)}, {args.workers} workers')
+    for label, run in (('naive pool', lambda: naive_pool(jobs, args.workers)),
+                       (f'scheduled ({args.order})', lambda: scheduled(jobs, args.workers, args.order))):
+        times = []
+        for _ in range(args.repeat):
+            started = perf_counter()
+            run()
+            times.append(perf_counter() - started)
+        best = min(times)
+        print(f'{label:>20}: best {best:.2f}s, {convert_size(total / best if best else 0)}/s')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+"""Single-pass hashing of a file into its MD5, its SHA3-256, optionally a fast non-cryptographic digest for
+change detection and, for files larger than one block, a BLAKE2b digest of each fixed-size block. The block
+digests are kept in a BlockDigests csv next to the inventory, so a large file that has been appended to or changed
+in place can be re-verified block by block (see verify_blocks.py).
+"""
+
+import csv
+import hashlib
+import re
+from functools import partial
+from os import fstat
+from os.path import basename, dirname, join
+
+try:
+    import xxhash
+except ImportError:  # Optional: BLAKE2b from the standard library is used instead
+    xxhash = None
+
+READ_SIZE = 2 ** 20  # Bytes read from a file at a time
+BLOCK_SIZE = 64 * 2 ** 20  # Default block size for --block-digests
+BLOCK_COLUMNS = ['RelPath', 'Block', 'Offset', 'Length', 'BLAKE2b']
+FAST_DIGESTS = {'blake2b': partial(hashlib.blake2b, digest_size=16)}
+if xxhash is not None:
+    FAST_DIGESTS['xxh3'] = xxhash.xxh3_128
+    FAST_DIGESTS['xxh64'] = xxhash.xxh64
+DEFAULT_FAST = 'xxh3' if xxhash is not None else 'blake2b'
+SIZE = re.compile(r'^(\d+)([KMGT]?)I?B?$')
+UNITS = {'': 1, 'K': 2 ** 10, 'M': 2 ** 20, 'G': 2 ** 30, 'T': 2 ** 40}
+
+
+def parse_size(text):
+    """Parses a block size such as 65536, 64M or 1GiB into bytes. Raises ValueError on anything else."""
+    found = SIZE.match(text.strip().upper())
+    if not found or int(found.group(1)) == 0:
+        raise ValueError(f'Invalid block size: {text}')
+    return int(found.group(1)) * UNITS[found.group(2)]
+
+
+def block_digest():
+    return hashlib.blake2b(digest_size=32)
+
+
+def file_digests(filepathname, block_size=0, throttle=None, fast=None, strict=False, limit=0):
+    """Reads a file once and returns its MD5, its SHA3-256, a list of (offset, length, digest) blocks and, if a fast
+    algorithm is named, its fast digest as '<algorithm>:<hex>' (otherwise ''). Blocks are only computed when
+    block_size is given and the file is larger than one block. Reads are paced by the throttle, if one is given.
+    If the file can't be read, the digests are 'OS Error' and there are no blocks, or with strict the OSError is
+    raised. With a limit, only the first limit bytes are hashed, e.g. to time a sample.
+    """
+    hash_md5 = hashlib.md5()
+    hash_sha3 = hashlib.sha3_256()
+    hash_fast = FAST_DIGESTS[fast]() if fast else None
+    blocks = []
+    if throttle:
+        throttle.start_file()
+    try:
+        with open(filepathname, 'rb') as in_file:
+            if block_size and fstat(in_file.fileno()).st_size <= block_size:
+                block_size = 0
+            block = block_digest()
+            offset = 0  # Start of the current block
+            filled = 0  # Bytes of the current block read so far
+            if limit:
+                reading = lambda: in_file.read(min(READ_SIZE, max(limit - in_file.tell(), 0)))
+            else:
+                reading = lambda: in_file.read(READ_SIZE)
+            for chunk in iter(reading, b''):
+                if throttle:
+                    throttle.consume(len(chunk))
+                hash_md5.update(chunk)
+                hash_sha3.update(chunk)
+                if hash_fast:
+                    hash_fast.update(chunk)
+                if not block_size:
+                    continue
+                view = memoryview(chunk)
+                while view:
+                    take = min(len(view), block_size - filled)
+                    block.update(view[:take])
+                    view = view[take:]
+                    filled += take
+                    if filled == block_size:
+                        blocks.append((offset, filled, block.hexdigest()))
+                        offset += filled
+                        filled = 0
+                        block = block_digest()
+            if filled:
+                blocks.append((offset, filled, block.hexdigest()))
+    except OSError:
+        if strict:
+            raise
+        return 'OS Error', 'OS Error', [], 'OS Error' if fast else ''
+    return hash_md5.hexdigest(), hash_sha3.hexdigest(), blocks, f'{fast}:{hash_fast.hexdigest()}' if fast else ''
+
+
+def fast_file_digest(filepathname, fast, throttle=None):
+    """Reads a file and returns only its fast digest, as '<algorithm>:<hex>', or 'OS Error'."""
+    hash_fast = FAST_DIGESTS[fast]()
+    if throttle:
+        throttle.start_file()
+    try:
+        with open(filepathname, 'rb') as in_file:
+            for chunk in iter(lambda: in_file.read(READ_SIZE), b''):
+                if throttle:
+                    throttle.consume(len(chunk))
+                hash_fast.update(chunk)
+    except OSError:
+        return 'OS Error'
+    return f'{fast}:{hash_fast.hexdigest()}'
+
+
+def block_digests_path(inventory_csv):
+    """Path of the BlockDigests csv that goes with an Inventory_<name>_<datetime>.csv."""
+    return join(dirname(inventory_csv), 'BlockDigests_' + basename(inventory_csv).partition('_')[2])
+
+
+def write_blocks(writer, showpath, blocks):
+    """Writes the block rows of one file to a BlockDigests csv writer."""
+    writer.writerows([showpath, n, offset, length, digest] for n, (offset, length, digest) in enumerate(blocks))
+
+
+def read_blocks(blocks_csv):
+    """Reads a BlockDigests csv into {RelPath: [(offset, length, digest), ...]}, in block order. A block listed more
+    than once (e.g. after a resumed run) keeps its last entry.
+    """
+    files = {}
+    with open(blocks_csv, 'r', newline='') as in_csv:
+        for row in csv.DictReader(in_csv):
+            files.setdefault(row['RelPath'], {})[int(row['Block'])] = (int(row['Offset']), int(row['Length']),
+                                                                      row['BLAKE2b'])
+    return {relpath: [blocks[n] for n in sorted(blocks)] for relpath, blocks in files.items()}
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+"""Checkpoints for long inventory runs. Every so many rows, the temp inventory (and BlockDigests csv, if there is
+one) is flushed and fsync'd and its byte offset is recorded, so an interrupted run can pick up from the last
+checkpoint without rehashing the files already written.
+"""
+
+import csv
+import json
+from os import fsync, remove, replace
+from os.path import abspath, basename, isfile, join
+
+from block_digests import read_blocks
+
+CHECKPOINT_EVERY = 1000  # Rows written between checkpoints
+
+
+def checkpoint_path(indir, outdir, name=None):
+    """Path of the checkpoint file for inventorying indir (or the part of it called name) into outdir."""
+    return join(outdir, f'Inventory_{name or basename(indir)}.checkpoint')
+
+
+def load_checkpoint(indir, outdir, name=None):
+    """Returns the last checkpoint for this input directory, or None if there isn't a usable one."""
+    ckpt_path = checkpoint_path(indir, outdir, name)
+    if not isfile(ckpt_path):
+        return None
+    with open(ckpt_path, 'r') as ckpt_file:
+        ckpt = json.load(ckpt_file)
+    if ckpt.get('indir') != abspath(indir) or not isfile(ckpt.get('temp', '')):
+        return None
+    return ckpt
+
+
+def save_checkpoint(inventory, inv_path, indir, outdir, rows, name=None, blocks=None):
+    """Flushes the temp inventory, and the open BlockDigests csv if given, to disk and records how far they got. The
+    checkpoint file is replaced atomically so a crash while saving leaves the previous checkpoint intact.
+    """
+    inventory.flush()
+    fsync(inventory.fileno())
+    ckpt = {'indir': abspath(indir), 'temp': inv_path, 'offset': inventory.tell(), 'rows': rows}
+    if blocks is not None:
+        blocks.flush()
+        fsync(blocks.fileno())
+        ckpt.update(blocks=blocks.name, blocks_offset=blocks.tell())
+    ckpt_path = checkpoint_path(indir, outdir, name)
+    with open(ckpt_path + '.new', 'w') as ckpt_file:
+        json.dump(ckpt, ckpt_file)
+        ckpt_file.flush()
+        fsync(ckpt_file.fileno())
+    replace(ckpt_path + '.new', ckpt_path)
+
+
+def reopen_inventory(ckpt):
+    """Cuts the temp inventory, and its BlockDigests csv, back to the last checkpointed offsets, dropping any rows
+    written after them. Returns the reopened inventory, the set of RelPaths already inventoried and, for files with
+    several hard links, {(device, inode): (RelPath, hashes)} of the first path written, as kept during a run.
+    """
+    with open(ckpt['temp'], 'r+') as inventory:
+        inventory.truncate(ckpt['offset'])
+    if 'blocks' in ckpt and isfile(ckpt['blocks']):
+        with open(ckpt['blocks'], 'r+') as blocks:
+            blocks.truncate(ckpt['blocks_offset'])
+    done = set()
+    links = {}
+    with open(ckpt['temp'], 'r', newline='') as inventory:
+        for row in csv.DictReader(inventory):
+            done.add(row['RelPath'])
+            link_key = (int(row['device']), int(row['inode']))
+            if int(row['enlink']) > 1 and row['MD5'] != 'OS Error' and link_key not in links:
+                links[link_key] = (row['RelPath'], (row['MD5'], row['MD5-Time'], row['SHA3_256'], row['SHA3-Time'],
+                                                    [], row.get('FastDigest', '')))
+    if links and 'blocks' in ckpt and isfile(ckpt['blocks']):
+        file_blocks = read_blocks(ckpt['blocks'])
+        for link_key, (showpath, hashes) in links.items():
+            hashes[4].extend(file_blocks.get(showpath, []))
+    return open(ckpt['temp'], 'a'), done, links
+
+
+def clear_checkpoint(indir, outdir, name=None):
+    """Removes the checkpoint once the run has finished."""
+    ckpt_path = checkpoint_path(indir, outdir, name)
+    if isfile(ckpt_path):
+        remove(ckpt_path)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+"""Merkle-style directory digests for a sorted inventory. Each directory's digest is the SHA3-256 of its
+sorted children (file names with their SHA3-256, subdirectory names with their own digest), so two copies of
+a subtree match if and only if their directory digests match.
+"""
+
+import csv
+import hashlib
+from os import sep
+from os.path import basename, dirname, join
+
+from inventory_io import plain_path, read_inventory
+
+ERROR_DIGEST = 'OS Error'
+
+
+def _close(stack):
+    """Finishes the innermost open directory and hands its digest to its parent."""
+    dir_path, entries, files = stack.pop()
+    if any(entry.endswith(' ' + ERROR_DIGEST) for entry in entries):
+        digest = ERROR_DIGEST  # A file could not be read, so the subtree can't be trusted to match
+    else:
+        digest = hashlib.sha3_256('\n'.join(sorted(entries)).encode('utf-8')).hexdigest()
+    if stack:
+        stack[-1][1].append(f'D {basename(dir_path)} {digest}')
+        stack[-1][2] += files
+    return dir_path, files, digest
+
+
+def directory_digests(inventory_csv):
+    """Yields (RelPath, number of files, digest) for every directory of an inventory sorted by RelPath,
+    innermost directories first. Sorted order keeps every subtree contiguous, so only the directories on
+    the current path are held in memory. The inventory may be compressed or split.
+    """
+    stack = []  # [directory, child entries, file count] for each open directory
+    previous = ''
+    for row in read_inventory(inventory_csv):
+        rel_path = row['RelPath']
+        if rel_path < previous:
+            raise ValueError(f'{inventory_csv} is not sorted by RelPath')
+        previous = rel_path
+        parent = dirname(rel_path)
+        while stack and not (parent == stack[-1][0] or parent.startswith(stack[-1][0] + sep)):
+            yield _close(stack)
+        opened = stack[-1][0] if stack else ''
+        remainder = parent[len(opened):].strip(sep)
+        for part in remainder.split(sep) if remainder else []:
+            opened = join(opened, part) if opened else part
+            stack.append([opened, [], 0])
+        stack[-1][1].append(f'F {row["Filename"]} {row["SHA3_256"]}')
+        stack[-1][2] += 1
+    while stack:
+        yield _close(stack)
+
+
+def write_directory_digests(inventory_csv):
+    """Writes DirDigests_<name>_<datetime>.csv next to a sorted Inventory_<name>_<datetime>.csv."""
+    name = basename(plain_path(inventory_csv))
+    if name.startswith('Inventory_'):
+        name = name[len('Inventory_'):]
+    digests_path = join(dirname(inventory_csv), f'DirDigests_{name}')
+    with open(digests_path, 'w', newline='') as digests_csv:
+        writing = csv.writer(digests_csv)
+        writing.writerow(['RelPath', 'Files', 'SHA3_256'])
+        for dir_path, files, digest in directory_digests(inventory_csv):
+            writing.writerow([dir_path, str(files), digest])
+    return digests_path
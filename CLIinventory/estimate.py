@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+"""Quick estimate of an inventory before running it: file count, total size, file type mix and expected
+runtime. Walks metadata only, optionally visiting a random sample of subdirectories in very large trees,
+and times the hashing of a small sample of files to project how long the full inventory will take.
+"""
+
+from collections import Counter
+from os import stat
+from os.path import join, splitext
+from time import perf_counter
+
+from walk_filters import WalkFilter
+
+SAMPLE_FILES = 20  # Files hashed to measure throughput
+SAMPLE_BYTES = 16 * 2 ** 20  # Most bytes hashed from each sampled file
+
+
+def _fit_timings(timings):
+    """Fits hashing time as a fixed cost per file plus a cost per byte, by least squares over the
+    (size, seconds) timings of the sampled files.
+    """
+    if not timings:
+        return 0.0, 0.0
+    mean_size = sum(size for size, _ in timings) / len(timings)
+    mean_time = sum(elapsed for _, elapsed in timings) / len(timings)
+    spread = sum((size - mean_size) ** 2 for size, _ in timings)
+    if spread == 0:
+        return mean_time, 0.0
+    per_byte = sum((size - mean_size) * (elapsed - mean_time) for size, elapsed in timings) / spread
+    per_byte = max(per_byte, 0.0)
+    return max(mean_time - per_byte * mean_size, 0.0), per_byte
+
+
+def estimate_inventory(indir, hash_file, dir_fraction=1.0, sample_files=SAMPLE_FILES, seed=None, walk_filter=None,
+                       sample_bytes=SAMPLE_BYTES):
+    """Estimates the size of an inventory of indir. With a dir_fraction below 1, each subdirectory is
+    visited with that probability and counts are scaled up by the inverse of the chance of reaching it.
+    A random sample of the files seen is hashed with hash_file to measure throughput, reading at most
+    sample_bytes of each, so one very large file doesn't hold up the estimate. Files and
+    directories skipped by walk_filter are left out, and counted (in the directories visited) in the
+    report's 'skipped'.
+    """
+    import mimetypes  # Only estimates need these, so they aren't loaded when the inventory tools start
+    import random
+    rng = random.Random(seed)
+    files = 0.0
+    total_bytes = 0.0
+    mimes = Counter()
+    extensions = Counter()
+    sample = []  # Reservoir of (path, size) for the throughput measurement
+    seen = 0
+    weights = {indir: 1.0}  # Inverse of the probability of visiting each directory
+    skipped = Counter()
+    for base, dirs, names in (walk_filter or WalkFilter()).walk(indir, skipped):
+        weight = weights.pop(base, 1.0)
+        if dir_fraction < 1.0:
+            dirs[:] = [d for d in dirs if rng.random() < dir_fraction]
+        for d in dirs:
+            weights[join(base, d)] = weight / dir_fraction
+        for name in names:
+            filepathname = join(base, name)
+            try:
+                size = stat(filepathname).st_size
+            except OSError:
+                continue
+            files += weight
+            total_bytes += size * weight
+            mimes[str(mimetypes.guess_type(filepathname)[0])] += weight
+            extensions[splitext(name)[1].lower() or '(none)'] += weight
+            seen += 1
+            if len(sample) < sample_files:
+                sample.append((filepathname, size))
+            elif rng.random() < sample_files / seen:
+                sample[rng.randrange(sample_files)] = (filepathname, size)
+    timings = []
+    for filepathname, size in sample:
+        started = perf_counter()
+        hash_file(filepathname, limit=sample_bytes)
+        timings.append((min(size, sample_bytes), perf_counter() - started))
+    per_file, per_byte = _fit_timings(timings)
+    seconds = per_file * files + per_byte * total_bytes
+    return {'files': round(files), 'bytes': round(total_bytes), 'mimes': mimes, 'extensions': extensions,
+            'sampled_files': len(sample), 'sampled_bytes': sum(size for size, _ in timings),
+            'hash_seconds': sum(elapsed for _, elapsed in timings), 'projected_seconds': seconds,
+            'sampled_dirs': dir_fraction < 1.0, 'skipped': skipped}
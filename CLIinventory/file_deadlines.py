@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+"""Deadlines and retries for hashing files on storage that can hang or fail now and then, such as a network share
+with stale handles. With a timeout, each file is read in a thread of its own and watched: a read that makes no
+progress for the timeout is abandoned (the thread is left to finish or hang on its own) and the file is reported as
+stuck, so the run can set it aside and carry on. Reads that fail with a transient OS error are retried a few times,
+with a pause that doubles each time.
+"""
+
+import csv
+import errno
+import threading
+from os.path import join, relpath, dirname
+from time import monotonic, sleep, strftime
+
+RETRIES = 2  # Extra attempts at a file after a transient error
+BACKOFF = 1.0  # Seconds before the first retry, doubled for each one after
+POLL = 0.5  # Longest wait between checks on a read in progress
+# Errors that may go away if the read is tried again, as on a share that drops out for a moment
+TRANSIENT = {getattr(errno, name) for name in ('EIO', 'EAGAIN', 'EINTR', 'ETIMEDOUT', 'ESTALE', 'ENOTCONN',
+                                               'ECONNRESET', 'ECONNABORTED', 'EHOSTDOWN', 'EHOSTUNREACH',
+                                               'ENETDOWN', 'ENETUNREACH', 'ENETRESET') if hasattr(errno, name)}
+QUARANTINE_COLUMNS = ['RelPath', 'Filesize', 'Result']
+OS_ERROR = 'OS Error'  # Digest recorded for a file that can't be read
+
+
+class FileStuck(Exception):
+    """A read made no progress for the timeout."""
+
+
+class Heartbeat:
+    """Stands in for the throttle of one read, noting when the read last made progress. Time spent waiting on the
+    throttle doesn't count as a stall.
+    """
+
+    def __init__(self, throttle=None):
+        self.throttle = throttle
+        self.last = monotonic()
+        self.waiting = False
+
+    def start_file(self):
+        if self.throttle:
+            self._pace(self.throttle.start_file)
+        self.last = monotonic()
+
+    def consume(self, amount):
+        self.last = monotonic()
+        if self.throttle:
+            self._pace(self.throttle.consume, amount)
+
+    def _pace(self, wait, *args):
+        self.waiting = True
+        try:
+            wait(*args)
+        finally:
+            self.last = monotonic()
+            self.waiting = False
+
+    def stalled(self, timeout):
+        return not self.waiting and monotonic() - self.last > timeout
+
+
+class Deadline:
+    """Calls hasher(path, throttle=..., strict=True) for each file, retrying transient errors. failed(err) gives the
+    result for a file that can't be read. With a timeout (in seconds), a read that makes no progress for that long
+    raises FileStuck. Safe to share between threads.
+    """
+
+    def __init__(self, hasher, failed, timeout=None, throttle=None, retries=RETRIES, backoff=BACKOFF):
+        self.hasher = hasher
+        self.failed = failed
+        self.timeout = timeout
+        self.throttle = throttle
+        self.retries = retries
+        self.backoff = backoff
+
+    def __call__(self, filepathname):
+        for attempt in range(self.retries + 1):
+            if attempt:
+                sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                return self._read(filepathname)
+            except OSError as err:
+                if err.errno not in TRANSIENT or attempt == self.retries:
+                    return self.failed(err)
+
+    def _read(self, filepathname):
+        if not self.timeout:
+            return self.hasher(filepathname, throttle=self.throttle, strict=True)
+        heartbeat = Heartbeat(self.throttle)
+        outcome = {}
+
+        def read():
+            try:
+                outcome['result'] = self.hasher(filepathname, throttle=heartbeat, strict=True)
+            except Exception as err:
+                outcome['error'] = err
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        while True:
+            reader.join(min(POLL, self.timeout))
+            if not reader.is_alive():
+                break
+            if heartbeat.stalled(self.timeout):
+                raise FileStuck(f'No progress reading {filepathname} for {self.timeout:g}s')
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['result']
+
+
+class Quarantine:
+    """Files whose reads got stuck, set aside so the rest of a run can go on, and retried once it is done."""
+
+    def __init__(self, hasher):
+        self.hasher = hasher
+        self.jobs = []
+        self.results = {}  # Path: 'Recovered', 'Unreadable' or 'Timed out'
+        self.links = []  # Other links to held files that couldn't be read
+        self.retrying = False
+
+    def hold(self, job):
+        """Sets a stuck (path, statinfo) job aside. Returns False if the job is already being retried, in which
+        case it stays stuck.
+        """
+        if self.retrying:
+            self.results[job[0]] = 'Timed out'
+            return False
+        self.jobs.append(job)
+        return True
+
+    def hold_links(self, job, links):
+        """Records the other (path, statinfo) links to a job that couldn't be read, if the job was held, so they are
+        reported as unreadable along with it.
+        """
+        if job[0] in self.results:
+            self.links.extend(links)
+
+    def retry(self):
+        """Reads each held file again, yielding (job, result, error) like io_scheduler.schedule."""
+        self.retrying = True
+        for job in self.jobs:
+            try:
+                result = self.hasher(job[0])
+            except FileStuck as err:
+                yield job, None, err
+                continue
+            self.results[job[0]] = 'Unreadable' if result[0] == OS_ERROR else 'Recovered'
+            yield job, result, None
+
+    def write_report(self, indir, outdir, inv_name):
+        """Writes a Quarantine_<name>_<datetime>.csv of the held files and what became of them. Returns its path."""
+        report_path = join(outdir, f'Quarantine_{inv_name}_{strftime("%Y%b%d_%H%M%S")}.csv')
+        with open(report_path, 'w', newline='') as report:
+            writing = csv.writer(report)
+            writing.writerow(QUARANTINE_COLUMNS)
+            for filepathname, statinfo in self.jobs:
+                writing.writerow([relpath(filepathname, dirname(indir)), statinfo.st_size,
+                                  self.results.get(filepathname, 'Timed out')])
+            for filepathname, statinfo in self.links:
+                writing.writerow([relpath(filepathname, dirname(indir)), statinfo.st_size, 'Unreadable'])
+        return report_path
+
+    def summary(self, report_path):
+        results = [self.results.get(job[0], 'Timed out') for job in self.jobs]
+        return (f'{len(self.jobs)} files stalled and were retried at the end of the run: '
+                f'{results.count("Recovered")} recovered, {results.count("Unreadable")} failed with an error and '
+                f'{results.count("Timed out")} still timed out (recorded as OS Error).'
+                + (f' {len(self.links)} other links to them were unreadable too.' if self.links else '')
+                + f' See {report_path}')
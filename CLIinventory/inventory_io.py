@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+"""Reading and writing inventories that are compressed (gzip, or zstd if the zstandard module is installed) or
+split into parts. A split inventory is written as numbered parts plus an index csv listing the rows and the first
+and last RelPath of each part, so a reader that only wants one subtree opens only the parts that can hold it.
+"""
+
+import csv
+from importlib.util import find_spec
+from operator import itemgetter
+from os import sep
+from os.path import basename, dirname, join
+
+COMPRESSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+GZIP_LEVEL = 6  # Much faster to write than the default of 9, for slightly larger files
+INDEX_SUFFIX = '.index.csv'
+INDEX_COLUMNS = ['Part', 'Rows', 'First RelPath', 'Last RelPath']
+
+
+def zstd_available():
+    """Whether the optional zstandard module is installed, without importing it."""
+    return find_spec('zstandard') is not None
+
+
+def open_text(filepath, mode='r'):
+    """Opens a plain, .gz or .zst csv as text, for reading ('r') or writing ('w'). The compression modules
+    are only imported when a compressed file is opened, so plain runs don't pay for loading them.
+    """
+    if filepath.endswith('.gz'):
+        import gzip
+        return gzip.open(filepath, mode + 't', compresslevel=GZIP_LEVEL, newline='')
+    if filepath.endswith('.zst'):
+        if not zstd_available():
+            raise ValueError(f'{filepath} is compressed with zstd, but the zstandard module is not installed.')
+        import zstandard
+        return zstandard.open(filepath, mode + 't', newline='')
+    return open(filepath, mode, newline='')
+
+
+def plain_path(filepath):
+    """The path an inventory would have as one uncompressed csv. Its other outputs are named after this."""
+    for suffix in COMPRESSIONS.values():
+        if filepath.endswith(suffix):
+            filepath = filepath[:-len(suffix)]
+    if filepath.endswith(INDEX_SUFFIX):
+        filepath = filepath[:-len(INDEX_SUFFIX)] + '.csv'
+    return filepath
+
+
+class InventoryWriter:
+    """Writes inventory rows (dictionaries) to output_path, compressed if a compression is given. With part_rows,
+    the rows are split into parts of that many rows, named <name>.part0001.csv and so on, and listed in a
+    <name>.index.csv. Rows must then be written in RelPath order, so the ranges in the index don't overlap.
+    """
+
+    def __init__(self, output_path, fieldnames, compression=None, part_rows=0):
+        if compression == 'zstd' and not zstd_available():
+            raise ValueError('zstd compression needs the zstandard module.')
+        self.base = output_path[:-len('.csv')] if output_path.endswith('.csv') else output_path
+        self.suffix = '.csv' + COMPRESSIONS.get(compression, '')
+        self.fieldnames = fieldnames
+        self.part_rows = part_rows
+        self.parts = []  # [part file name, rows, first RelPath, last RelPath] for each part
+        self.out = None
+        if not part_rows:
+            self._open(self.base + self.suffix)
+
+    def _open(self, part_path):
+        if self.out:
+            self.out.close()
+        self.out = open_text(part_path, 'w')
+        self.writer = csv.DictWriter(self.out, fieldnames=self.fieldnames)
+        self.writer.writeheader()
+        self.parts.append([basename(part_path), 0, '', ''])
+
+    def writerow(self, row):
+        if self.part_rows and (self.out is None or self.parts[-1][1] == self.part_rows):
+            self._open(f'{self.base}.part{len(self.parts) + 1:04d}{self.suffix}')
+        self.writer.writerow(row)
+        part = self.parts[-1]
+        part[1] += 1
+        if part[1] == 1:
+            part[2] = row['RelPath']
+        part[3] = row['RelPath']
+
+    def close(self):
+        """Finishes the output and returns the path to hand to readers: the inventory itself or its index."""
+        if self.out is None:  # No rows: still write one part, so the columns are recorded
+            self._open(f'{self.base}.part0001{self.suffix}')
+        self.out.close()
+        if not self.part_rows:
+            return self.base + self.suffix
+        index_path = self.base + INDEX_SUFFIX
+        with open(index_path, 'w', newline='') as index_csv:
+            writing = csv.writer(index_csv)
+            writing.writerow(INDEX_COLUMNS)
+            writing.writerows(self.parts)
+        return index_path
+
+
+def read_index(index_path):
+    """Reads the index of a split inventory into a list of (part path, first RelPath, last RelPath)."""
+    with open(index_path, 'r', newline='') as index_csv:
+        return [(join(dirname(index_path), row['Part']), row['First RelPath'], row['Last RelPath'])
+                for row in csv.DictReader(index_csv)]
+
+
+def inventory_fieldnames(filepath):
+    """The columns of an inventory, plain, compressed or split."""
+    if filepath.endswith(INDEX_SUFFIX):
+        filepath = read_index(filepath)[0][0]
+    with open_text(filepath) as in_csv:
+        return csv.DictReader(in_csv).fieldnames
+
+
+def _read_parts(filepath, subtree, read_rows):
+    """Yields the rows of an inventory, plain, compressed or split, that read_rows(open csv) gives as (RelPath, row)
+    pairs, keeping only those under the subtree, if one is given. Of a split inventory, only the parts whose RelPath
+    range can hold the subtree are read, and reading stops once past them.
+    """
+    prefix = subtree.strip(sep) + sep if subtree and subtree.strip(sep) not in ('', '.') else None
+    split = filepath.endswith(INDEX_SUFFIX)
+    for part_path, first, last in read_index(filepath) if split else [(filepath, None, None)]:
+        if prefix and split:
+            # RelPath starts with the name of the inventoried directory
+            if first.partition(sep)[2][:len(prefix)] > prefix:
+                return  # The parts are in RelPath order, so none of the rest can hold the subtree
+            if last.partition(sep)[2] < prefix:
+                continue
+        with open_text(part_path) as in_csv:
+            for relpath, row in read_rows(in_csv):
+                if prefix is None:
+                    yield row
+                    continue
+                key = relpath.partition(sep)[2]
+                if key.startswith(prefix):
+                    yield row
+                elif split and key > prefix:
+                    return
+
+
+def read_inventory(filepath, subtree=None):
+    """Yields the rows of an inventory, plain, compressed or split, as dictionaries. With a subtree (a directory
+    relative to the inventoried one), only the files under it are yielded.
+    """
+    return _read_parts(filepath, subtree, lambda in_csv: ((row['RelPath'], row) for row in csv.DictReader(in_csv)))
+
+
+def read_columns(filepath, columns, subtree=None):
+    """Like read_inventory, but yields a tuple of only the named columns of each row. Much faster than building a
+    dictionary per row, for readers that go through every row of a large inventory. Raises ValueError if a column
+    is missing.
+    """
+    def column_rows(in_csv):
+        reading = csv.reader(in_csv)
+        header = next(reading, [])
+        for column in ['RelPath'] + list(columns):
+            if column not in header:
+                raise ValueError(f'{filepath} has no {column} column.')
+        at = header.index('RelPath')
+        at_columns = [header.index(column) for column in columns]
+        picking = itemgetter(*at_columns) if len(at_columns) > 1 else lambda row: (row[at_columns[0]],)
+        for row in reading:
+            yield row[at], picking(row)
+
+    return _read_parts(filepath, subtree, column_rows)
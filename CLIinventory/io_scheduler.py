@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+"""Per-device I/O scheduling for reading many files at once. Work is grouped by the device each file lives
+on and ordered by inode (or by physical offset, where the filesystem reports it). Each device gets its own
+concurrency limit, so a spinning disk reads one file at a time while SSDs and network shares run several.
+"""
+
+import queue
+import struct
+import threading
+from collections import deque
+from os import major, minor, stat
+from os.path import join
+from stat import S_ISBLK
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+# Number of files read at once on each device, by kind of device
+DEVICE_CONCURRENCY = {'rotational': 1, 'ssd': 4, 'network': 8, 'unknown': 2}
+ORDERS = ('inode', 'offset', 'none')
+FS_IOC_FIEMAP = 0xC020660B
+# Filesystem types, as listed in /proc/self/mountinfo, that are read over the network
+NETWORK_FILESYSTEMS = {'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'fuse.sshfs', 'sshfs', '9p', 'afs', 'ceph',
+                       'glusterfs', 'fuse.glusterfs', 'lustre', 'gpfs', 'fuse.rclone', 'davfs', 'fuse.davfs2'}
+MOUNTINFO = '/proc/self/mountinfo'
+
+
+def mount_of(device):
+    """Returns the filesystem type and source of the mount on a device, from /proc/self/mountinfo, or (None, None)
+    if it isn't listed there (or there is no mountinfo, as off Linux).
+    """
+    wanted = f'{major(device)}:{minor(device)}'
+    try:
+        with open(MOUNTINFO, 'r') as mounts:
+            for line in mounts:
+                fields = line.split()
+                if fields[2] == wanted:
+                    fs_type, source = fields[fields.index('-') + 1:][:2]
+                    return fs_type, source
+    except (OSError, ValueError, IndexError):
+        pass
+    return None, None
+
+
+def device_kind(device):
+    """Guesses whether a device is a spinning disk, an SSD, or a network filesystem."""
+    fs_type, source = mount_of(device)
+    if fs_type in NETWORK_FILESYSTEMS:
+        return 'network'
+    if major(device) == 0:
+        # Anonymous devices (btrfs, overlayfs, tmpfs, FUSE, ...): go by the disk the mount comes from, if any
+        try:
+            source_info = stat(source)
+        except (OSError, TypeError):
+            return 'unknown'
+        if not S_ISBLK(source_info.st_mode):
+            return 'unknown'
+        device = source_info.st_rdev
+    block_dir = f'/sys/dev/block/{major(device)}:{minor(device)}'
+    # Partitions keep their queue settings on the parent disk
+    for flag_path in (join(block_dir, 'queue', 'rotational'), join(block_dir, '..', 'queue', 'rotational')):
+        try:
+            with open(flag_path, 'r') as flag:
+                return 'rotational' if flag.read().strip() == '1' else 'ssd'
+        except OSError:
+            pass
+    return 'unknown'
+
+
+def parse_limits(limits):
+    """Turns 'kind=N' strings from the command line into a concurrency dictionary."""
+    concurrency = {}
+    for limit in limits or []:
+        kind, _, number = limit.partition('=')
+        if kind not in DEVICE_CONCURRENCY or not number.isdigit() or int(number) < 1:
+            raise ValueError(f'Device limits look like kind=N, where kind is one of: {", ".join(DEVICE_CONCURRENCY)}')
+        concurrency[kind] = int(number)
+    return concurrency
+
+
+def physical_offset(file_name):
+    """Returns the physical byte offset of the first extent of a file, or None if the filesystem won't say."""
+    if fcntl is None:
+        return None
+    # struct fiemap (32 bytes) followed by room for one struct fiemap_extent (56 bytes)
+    request = bytearray(struct.pack('=QQLLLL', 0, 0xFFFFFFFFFFFFFFFF, 0, 0, 1, 0) + bytes(56))
+    try:
+        with open(file_name, 'rb') as handle:
+            fcntl.ioctl(handle.fileno(), FS_IOC_FIEMAP, request)
+    except OSError:
+        return None
+    if struct.unpack_from('=L', request, 20)[0] == 0:  # No mapped extents, e.g. empty or inline files
+        return None
+    return struct.unpack_from('=Q', request, 40)[0]
+
+
+def order_jobs(jobs, order='inode'):
+    """Sorts (path, statinfo) jobs from one device by inode, by physical offset, or leaves them as given.
+    Files without a known offset are read last, in inode order.
+    """
+    if order == 'inode':
+        return sorted(jobs, key=lambda job: job[1].st_ino)
+    if order == 'offset':
+        offsets = {job[0]: physical_offset(job[0]) for job in jobs}
+        return sorted(jobs, key=lambda job: (offsets[job[0]] is None, offsets[job[0]] or job[1].st_ino))
+    return list(jobs)
+
+
+class ReadSlots:
+    """Limits on the files read at once, which several schedules running side by side (one per root, in batch
+    mode) can share: max_workers caps the reads over all of them and each device has its concurrency limit.
+    """
+
+    def __init__(self, max_workers, concurrency=None):
+        self.max_workers = max_workers
+        self.budget = threading.BoundedSemaphore(max_workers)
+        self.limits = dict(DEVICE_CONCURRENCY, **(concurrency or {}))
+        self.devices = {}  # Device: (limit, semaphore)
+        self.lock = threading.Lock()
+
+    def device(self, device):
+        """The concurrency limit of a device and the semaphore that enforces it."""
+        with self.lock:
+            if device not in self.devices:
+                limit = self.limits[device_kind(device)]
+                self.devices[device] = (limit, threading.BoundedSemaphore(limit))
+            return self.devices[device]
+
+
+def _device_worker(func, pending, device_slots, budget, finished):
+    """Takes jobs for one device off its queue until none are left."""
+    while True:
+        try:
+            job = pending.popleft()
+        except IndexError:
+            return
+        with device_slots, budget:
+            try:
+                finished.put((job, func(job[0]), None))
+            except Exception as err:
+                finished.put((job, None, err))
+
+
+def schedule(func, jobs, max_workers, concurrency=None, order='inode', slots=None):
+    """Runs func(path) for every (path, statinfo) job and yields (job, result, error) as each one finishes.
+    Each device runs at most its concurrency limit at once and max_workers caps the total over all devices.
+    Given shared ReadSlots, their limits apply instead, over this and every other schedule using them.
+    """
+    slots = slots or ReadSlots(max_workers, concurrency)
+    devices = {}
+    for job in jobs:
+        devices.setdefault(job[1].st_dev, []).append(job)
+    finished = queue.Queue()
+    workers = []
+    for device, dev_jobs in devices.items():
+        pending = deque(order_jobs(dev_jobs, order))
+        limit, device_slots = slots.device(device)
+        for _ in range(min(limit, slots.max_workers, len(pending))):
+            workers.append(threading.Thread(target=_device_worker,
+                                            args=(func, pending, device_slots, slots.budget, finished),
+                                            daemon=True))
+    for worker in workers:
+        worker.start()
+    for _ in range(sum(len(dev_jobs) for dev_jobs in devices.values())):
+        yield finished.get()
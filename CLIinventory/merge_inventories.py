@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+"""Merges the partial inventories written by `CLIinventory.py --shard K/N` into one inventory sorted by
+RelPath, renumbering the rows. The partials are already sorted, so they are streamed through a k-way merge
+and never held in memory.
+"""
+
+import argparse
+import csv
+import heapq
+import re
+from os import remove, replace, sep
+from os.path import basename, isdir, isfile, join
+from time import strftime
+
+from dir_digests import write_directory_digests
+from inventory_io import inventory_fieldnames, read_inventory
+
+SHARD_FILE = re.compile(r'_shard(\d+)of(\d+)_')
+
+
+def sorted_rows(partial):
+    """Yields the rows of one partial inventory, checking that they are sorted by RelPath."""
+    previous = ''
+    for row in read_inventory(partial):
+        if row['RelPath'] < previous:
+            raise ValueError(f'{partial} is not sorted by RelPath (at {row["RelPath"]}).')
+        previous = row['RelPath']
+        yield row
+
+
+def missing_shards(partials):
+    """Lists the shards missing from a set of partials, judging by the shard numbers in their names."""
+    found = [SHARD_FILE.search(basename(p)) for p in partials]
+    totals = set(int(f.group(2)) for f in found if f)
+    if len(totals) != 1:
+        return []
+    total = totals.pop()
+    present = set(int(f.group(1)) for f in found if f)
+    return [k for k in range(1, total + 1) if k not in present]
+
+
+def merge_inventories(partials, outdir):
+    """Merges sorted partial inventories into Inventory_<name>_<datetime>.csv in outdir, where name is the
+    inventoried directory. Returns the path of the merged inventory and the number of rows.
+    """
+    headers = None
+    for partial in partials:
+        fieldnames = inventory_fieldnames(partial)
+        if headers is None:
+            headers = fieldnames
+        elif fieldnames != headers:
+            raise ValueError(f'{partial} does not have the same columns as {partials[0]}.')
+    temp_path = join(outdir, f'Inventory_merge_{strftime("%Y%b%d_%H%M%S")}temp.csv')
+    n = 0
+    root = None
+    previous = None
+    try:
+        with open(temp_path, 'w') as out_csv:
+            writing = csv.DictWriter(out_csv, fieldnames=headers)
+            writing.writeheader()
+            for row in heapq.merge(*[sorted_rows(p) for p in partials], key=lambda row: row['RelPath']):
+                if row['RelPath'] == previous:
+                    raise ValueError(f'{row["RelPath"]} appears in more than one partial inventory.')
+                previous = row['RelPath']
+                root = root or row['RelPath'].split(sep)[0]
+                n += 1
+                row['No.'] = str(n)
+                writing.writerow(row)
+    except ValueError:
+        remove(temp_path)
+        raise
+    output_path = join(outdir, f'Inventory_{root or "merged"}_{strftime("%Y%b%d_%H%M%S")}.csv')
+    replace(temp_path, output_path)
+    return output_path, n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge partial (sharded) inventories into one sorted inventory.")
+    parser.add_argument("partials", nargs='+', help="Paths to the partial inventories")
+    parser.add_argument("-o", '--output', help="Path to directory where the merged inventory will be placed",
+                        required=True)
+    parser.add_argument('--dir-digests', action='store_true',
+                        help="Also write a DirDigests csv for the merged inventory")
+    args = parser.parse_args()
+    missing = [p for p in args.partials if not isfile(p)]
+    if missing or not isdir(args.output):
+        print('There was an error with your input.')
+        return
+    absent = missing_shards(args.partials)
+    if absent:
+        print(f'Warning: no partial inventory given for shard(s): {", ".join(str(k) for k in absent)}')
+    try:
+        output_path, rows = merge_inventories(args.partials, args.output)
+    except ValueError as err:
+        print(f'Error: {err}\nQuitting...')
+        return
+    if args.dir_digests:
+        write_directory_digests(output_path)
+    print(f'Merged {rows} rows from {len(args.partials)} partial inventories.\nOutput File: {output_path}')
+
+
+if __name__ == "__main__":
+    main()
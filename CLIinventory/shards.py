@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+
+"""Deterministic partitioning of an inventory into shards, so several hosts or processes can each
+inventory part of one tree. Shards are numbered 1 to N and assigned by CRC-32, which gives every host the
+same answer regardless of platform or Python version.
+"""
+
+import re
+from os.path import basename
+from zlib import crc32
+
+SHARD_MODES = ('top', 'hash')
+SHARD_PATTERN = re.compile(r'^(\d+)/(\d+)$')
+
+
+def parse_shard(text):
+    """Turns 'K/N' from the command line into a (K, N) pair."""
+    found = SHARD_PATTERN.match(text)
+    if not found or not 1 <= int(found.group(1)) <= int(found.group(2)):
+        raise ValueError('Shards look like K/N, where 1 <= K <= N')
+    return int(found.group(1)), int(found.group(2))
+
+
+def shard_of(key, shards):
+    """The shard (1 to shards) that a top-level name or root-relative path belongs to."""
+    return crc32(key.encode('utf-8')) % shards + 1
+
+
+def shard_name(indir, shard=None):
+    """Name used for the output files of one shard of an inventory of indir."""
+    if shard is None:
+        return basename(indir)
+    return f'{basename(indir)}_shard{shard[0]}of{shard[1]}'
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+"""Token-bucket limits on bytes and files read per second, shared by all the threads hashing files, so a run
+can be kept from saturating production storage. The limits can be changed while a run is going by editing a
+control file, which is re-read when it changes or when the process gets SIGHUP.
+"""
+
+import re
+import signal
+import threading
+from os import stat
+from time import monotonic, sleep
+
+RATE = re.compile(r'^(\d+(?:\.\d+)?)([KMGT]?)I?B?(?:/S)?$')
+UNITS = {'': 1, 'K': 2 ** 10, 'M': 2 ** 20, 'G': 2 ** 30, 'T': 2 ** 40}
+UNLIMITED = ('', '0', 'NONE', 'OFF')
+CHECK_EVERY = 1.0  # Seconds between checks of the control file
+
+
+def parse_rate(text):
+    """Parses a rate such as 50M, 50MB/s, 1.5G or 0.5 into bytes (or files) per second. Fractions are kept, so a
+    rate below 1 still limits. Raises ValueError on anything else.
+    """
+    found = RATE.match(text.strip().upper())
+    if not found or float(found.group(1)) == 0:
+        raise ValueError(f'Invalid rate: {text}')
+    return float(found.group(1)) * UNITS[found.group(2)]
+
+
+def read_control(control_file):
+    """Reads the limits from a control file of 'bytes=50M' and 'files=200' lines. A limit that is missing,
+    0, none or off means no limit. Raises ValueError (or OSError) if the file can't be used.
+    """
+    rates = {'bytes': None, 'files': None}
+    with open(control_file, 'r') as control:
+        for line in control:
+            line = line.split('#')[0].strip()
+            if not line:
+                continue
+            kind, _, value = line.partition('=')
+            kind = kind.strip().lower()
+            if kind not in rates:
+                raise ValueError(f'Unknown limit in {control_file}: {kind}')
+            rates[kind] = None if value.strip().upper() in UNLIMITED else parse_rate(value)
+    return rates
+
+
+def describe_rates(rates):
+    byte_rate = f'{rates["bytes"] / 2 ** 20:.1f} MiB/s' if rates['bytes'] else 'unlimited'
+    file_rate = f'{rates["files"]:g} files/s' if rates['files'] else 'unlimited'
+    return f'{byte_rate}, {file_rate}'
+
+
+class Throttle:
+    """Token buckets holding up to one second of bytes and of files. Each read takes its share from the bucket
+    and, once the bucket is empty, sleeps until the rate has paid for it. Safe to share between threads. Also
+    counts what went through, to report the throughput achieved.
+    """
+
+    def __init__(self, rate=None, file_rate=None, control_file=None):
+        self.rates = {'bytes': rate, 'files': file_rate}
+        self.tokens = {'bytes': 0, 'files': 0}  # Buckets start empty, so no run starts with a burst
+        self.totals = {'bytes': 0, 'files': 0}
+        self.started = monotonic()
+        self.updated = {'bytes': self.started, 'files': self.started}
+        self.control_file = control_file
+        self.control_mtime = None
+        self.checked = 0.0
+        self.reload = False  # Set by SIGHUP
+        self.lock = threading.Lock()
+        if control_file:
+            self._check_control(self.started)
+
+    def consume(self, amount):
+        """Takes amount bytes, waiting if the byte rate has been reached."""
+        self._take('bytes', amount)
+
+    def start_file(self):
+        """Takes one file, waiting if the file rate has been reached."""
+        self._take('files', 1)
+
+    def request_reload(self, *args):
+        """Signal handler: re-read the control file before the next read."""
+        self.reload = True
+
+    def _take(self, kind, amount):
+        with self.lock:
+            now = monotonic()
+            if self.control_file and (self.reload or now - self.checked >= CHECK_EVERY):
+                self._check_control(now)
+            self.totals[kind] += amount
+            rate = self.rates[kind]
+            if not rate:
+                return
+            self.tokens[kind] = min(rate, self.tokens[kind] + (now - self.updated[kind]) * rate)
+            self.updated[kind] = now
+            self.tokens[kind] -= amount
+            wait = -self.tokens[kind] / rate if self.tokens[kind] < 0 else 0
+        if wait:
+            sleep(wait)
+
+    def _check_control(self, now):
+        """Re-reads the control file if it has changed (or a reload was requested). Called with the lock held."""
+        self.checked = now
+        try:
+            mtime = stat(self.control_file).st_mtime
+            if mtime == self.control_mtime and not self.reload:
+                return
+            self.control_mtime = mtime
+            rates = read_control(self.control_file)
+        except (OSError, ValueError) as err:
+            if not self.reload and self.control_mtime is None:
+                return  # No control file yet: keep the limits from the command line
+            print(f'\nWarning: could not read throttle limits, keeping the current ones: {err}')
+            self.control_mtime = None  # Warn once, then wait quietly for a usable file
+            return
+        finally:
+            self.reload = False
+        for kind, rate in rates.items():
+            if rate != self.rates[kind]:
+                self.tokens[kind] = min(self.tokens[kind], rate) if self.rates[kind] and rate else 0
+                self.updated[kind] = now
+        self.rates = rates
+        print(f'\nThrottle limits: {describe_rates(rates)}')
+
+    def summary(self):
+        """The limits in force and the throughput achieved so far."""
+        elapsed = max(monotonic() - self.started, 1e-9)
+        return (f'Read {self.totals["bytes"] / 2 ** 20:.1f} MiB from {self.totals["files"]} files in {elapsed:.1f}s: '
+                f'{self.totals["bytes"] / 2 ** 20 / elapsed:.1f} MiB/s, {self.totals["files"] / elapsed:.1f} files/s '
+                f'(limits: {describe_rates(self.rates)})')
+
+
+def add_throttle_arguments(parser):
+    """Adds the --rate, --file-rate and --throttle-file options to an argument parser."""
+    parser.add_argument('--rate', type=parse_rate, metavar='BYTES/S',
+                        help="Cap on the total read rate over all workers, e.g. 50M for 50 MiB/s (default: no cap)")
+    parser.add_argument('--file-rate', type=parse_rate, metavar='FILES/S',
+                        help="Cap on the number of files opened per second over all workers (default: no cap)")
+    parser.add_argument('--throttle-file', metavar='PATH',
+                        help="Control file of 'bytes=50M' and 'files=200' lines, re-read when it changes or on "
+                             "SIGHUP, to change the limits during a run")
+
+
+def throttle_from_args(args):
+    """Builds the Throttle asked for on the command line, or None, and re-reads its control file on SIGHUP."""
+    if not (args.rate or args.file_rate or args.throttle_file):
+        return None
+    throttle = Throttle(args.rate, args.file_rate, args.throttle_file)
+    if args.throttle_file and hasattr(signal, 'SIGHUP'):  # No SIGHUP on Windows
+        signal.signal(signal.SIGHUP, throttle.request_reload)
+    return throttle
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+"""Re-verifies large files against the block digests written by `CLIinventory.py --block-digests` and reports which
+byte ranges differ. By default every recorded block is rehashed. With --append, files are assumed to only grow: just
+the last recorded block is rehashed and anything past it is reported as appended, so a large log or image that has
+grown is re-verified by reading a single block.
+"""
+
+import argparse
+import csv
+from os import sep, stat
+from os.path import basename, isdir, isfile, join
+from time import strftime
+
+from block_digests import READ_SIZE, block_digest, read_blocks
+
+
+def _merge_ranges(ranges):
+    """Joins adjacent (start, end) byte ranges."""
+    merged = []
+    for start, end in ranges:
+        if merged and merged[-1][1] == start:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def verify_file(filepathname, blocks, append_only=False):
+    """Rehashes the recorded blocks of one file (only the last one with append_only). Returns the status (Unchanged,
+    Changed, Appended, Truncated or Missing), the list of (start, end) byte ranges that differ or were added, and the
+    number of bytes read.
+    """
+    recorded = blocks[-1][0] + blocks[-1][1]
+    try:
+        size = stat(filepathname).st_size
+    except OSError:
+        return 'Missing', [(0, recorded)], 0
+    changed = []
+    bytes_read = 0
+    try:
+        with open(filepathname, 'rb') as in_file:
+            for offset, length, digest in (blocks[-1:] if append_only else blocks):
+                in_file.seek(offset)
+                block = block_digest()
+                remaining = length
+                while remaining:
+                    chunk = in_file.read(min(READ_SIZE, remaining))
+                    if not chunk:
+                        break
+                    block.update(chunk)
+                    remaining -= len(chunk)
+                    bytes_read += len(chunk)
+                if remaining or block.hexdigest() != digest:
+                    changed.append((offset, offset + length))
+    except OSError:
+        return 'Missing', [(0, recorded)], bytes_read
+    if size < recorded:
+        status = 'Truncated'
+    elif changed:
+        status = 'Changed'
+    elif size > recorded:
+        status = 'Appended'
+    else:
+        status = 'Unchanged'
+    if size > recorded:
+        changed.append((recorded, size))
+    return status, _merge_ranges(changed), bytes_read
+
+
+def verify_blocks(blocks_csv, root, outdir, append_only=False):
+    """Verifies every file in a BlockDigests csv, found under root, and writes the files that differ to
+    BlockCheck_<name>_<datetime>.csv in outdir. Returns the report path, a count of files per status, the bytes read
+    and the bytes recorded.
+    """
+    report_path = join(outdir, f'BlockCheck_{basename(root)}_{strftime("%Y%b%d_%H%M%S")}.csv')
+    statuses = {}
+    bytes_read = 0
+    bytes_recorded = 0
+    with open(report_path, 'w', newline='') as out_csv:
+        writer = csv.writer(out_csv)
+        writer.writerow(['RelPath', 'Status', 'Start', 'End', 'Bytes'])
+        for relpath, blocks in read_blocks(blocks_csv).items():
+            # RelPath starts with the name of the inventoried directory
+            status, ranges, read = verify_file(join(root, relpath.partition(sep)[2]), blocks, append_only)
+            statuses[status] = statuses.get(status, 0) + 1
+            bytes_read += read
+            bytes_recorded += blocks[-1][0] + blocks[-1][1]
+            writer.writerows([relpath, status, start, end, end - start] for start, end in ranges)
+    return report_path, statuses, bytes_read, bytes_recorded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-verify large files against the block digests from an inventory "
+                                                 "and report the byte ranges that changed.")
+    parser.add_argument("blocks", help="Path to a BlockDigests csv")
+    parser.add_argument("root", help="Path to the inventoried directory as it is now")
+    parser.add_argument("-o", '--output', help="Path to directory where the report will be placed", required=True)
+    parser.add_argument('--append', action='store_true',
+                        help="Assume files only grow: rehash only the last recorded block of each file")
+    args = parser.parse_args()
+    if not isfile(args.blocks) or not isdir(args.root) or not isdir(args.output):
+        print('There was an error with your input.')
+        return
+    report_path, statuses, bytes_read, bytes_recorded = verify_blocks(args.blocks, args.root, args.output,
+                                                                     args.append)
+    for status, count in sorted(statuses.items()):
+        print(f'{status}: {count}')
+    share = 100 * bytes_read / bytes_recorded if bytes_recorded else 0
+    print(f'Read {bytes_read} of {bytes_recorded} recorded bytes ({share:.2f}%).\nReport: {report_path}')
+
+
+if __name__ == "__main__":
+    main()
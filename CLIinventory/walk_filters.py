@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+"""Include and exclude rules for directory walks, shared by the inventory tools and trans_mani. The rules are
+shell-style globs, compiled into one regular expression per kind of match, so each name is checked with a single
+match however many rules there are. Excluded directories are pruned before the walk descends into them, and what
+each rule skipped is counted for the end-of-run report.
+"""
+
+import re
+from fnmatch import translate
+from os import sep, walk
+from os.path import join, relpath
+
+DEFAULT_EXCLUDES = ('.DS_Store', 'Thumbs.db', '._*', '@eaDir/')
+TAR_INCLUDES = ('tar', 'tar.*', '*.tar', '*.tar.*')  # 'tar' as any dot-separated part of a name
+NOT_INCLUDED = 'not matching any --include rule'  # Reported for files that match no include rule
+KINDS = {'file': 'files', 'directory': 'directories'}
+
+
+class Reason(str):
+    """Why files were skipped, when it isn't an exclude rule; counted in place of the rule."""
+
+
+def _compile(rules):
+    """One regular expression matching any of the (number, glob) rules, with a named group per rule, so a match
+    tells which rule it was. None if there are no rules.
+    """
+    if not rules:
+        return None
+    return re.compile('|'.join(f'(?P<r{n}>{translate(glob)})' for n, glob in rules))
+
+
+class WalkFilter:
+    """Compiled include and exclude rules. An exclude rule is matched against a file or directory name or, if it
+    contains a '/', against the path within the walked directory (with '/' separators). A rule ending in '/' only
+    matches directories, and an excluded directory's whole subtree is skipped. If there are include rules, only
+    files whose names match one of them are kept; include rules don't prune directories. not_included says, in the
+    end-of-run report, why the files that match no include rule were skipped.
+    """
+
+    def __init__(self, excludes=DEFAULT_EXCLUDES, includes=(), not_included=NOT_INCLUDED):
+        self.rules = list(excludes)
+        self.not_included = Reason(not_included)
+        names, paths, dir_names, dir_paths = [], [], [], []
+        for n, rule in enumerate(self.rules):
+            glob = rule.rstrip('/')
+            if not glob:
+                continue
+            by_path = '/' in glob
+            if not rule.endswith('/'):
+                (paths if by_path else names).append((n, glob.lstrip('/')))
+            (dir_paths if by_path else dir_names).append((n, glob.lstrip('/')))
+        self.file_names = _compile(names)
+        self.file_paths = _compile(paths)
+        self.dir_names = _compile(dir_names)
+        self.dir_paths = _compile(dir_paths)
+        self.includes = _compile(list(enumerate(includes)))
+
+    def _excluded(self, names, paths, name, prefix):
+        """The exclude rule that matches a name (or its path, prefix + name), or None."""
+        found = (names and names.match(name)) or (paths and paths.match(prefix + name))
+        return self.rules[int(found.lastgroup[1:])] if found else None
+
+    def walk(self, root, skipped, on_skip=None):
+        """Walks root top down like os.walk, leaving out excluded files and pruning excluded directories. Each skip is
+        counted in skipped, a Counter of (rule, 'file' or 'directory'). on_skip, if given, is called with the path
+        and rule of every file left out.
+        """
+        by_path = self.file_paths or self.dir_paths
+        for base, dirs, files in walk(root):
+            prefix = ''
+            if by_path and base != root:
+                prefix = relpath(base, root).replace(sep, '/') + '/'
+            if self.dir_names or self.dir_paths:
+                kept = []
+                for name in dirs:
+                    rule = self._excluded(self.dir_names, self.dir_paths, name, prefix)
+                    if rule is None:
+                        kept.append(name)
+                    else:
+                        skipped[(rule, 'directory')] += 1
+                dirs[:] = kept
+            kept = []
+            for name in files:
+                rule = self._excluded(self.file_names, self.file_paths, name, prefix)
+                if rule is None and (self.includes is None or self.includes.match(name)):
+                    kept.append(name)
+                    continue
+                skipped[(self.not_included if rule is None else rule, 'file')] += 1
+                if on_skip:
+                    on_skip(join(base, name), rule)
+            yield base, dirs, kept
+
+    @staticmethod
+    def report(skipped):
+        """One line for each rule that skipped something."""
+        lines = []
+        for (rule, kind), count in sorted(skipped.items()):
+            noun = kind if count == 1 else KINDS[kind]
+            reason = rule if isinstance(rule, Reason) else f"matching '{rule}'"
+            lines.append(f'Skipped {count} {noun} {reason}.')
+        return lines
+
+
+def add_filter_arguments(parser, default_excludes=True):
+    """Adds the --exclude and --include options to an argument parser, and --no-default-excludes, or for tools that
+    don't skip anything unless asked to (default_excludes=False), --default-excludes.
+    """
+    parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                        help="Skip files and directories matching GLOB: a name, or a path within the root if it "
+                             "contains '/'; end it with '/' to match only directories, whose subtrees are then "
+                             "skipped. Can be repeated")
+    parser.add_argument('--include', action='append', default=[], metavar='GLOB',
+                        help="Only take files whose names match GLOB. Can be repeated")
+    if default_excludes:
+        parser.add_argument('--no-default-excludes', dest='default_excludes', action='store_false',
+                            help=f"Don't skip {', '.join(DEFAULT_EXCLUDES)} unless asked to")
+    else:
+        parser.add_argument('--default-excludes', action='store_true',
+                            help=f"Also skip {', '.join(DEFAULT_EXCLUDES)}")
+
+
+def filter_from_args(args, includes=(), not_included=NOT_INCLUDED):
+    """Builds the WalkFilter asked for on the command line, adding the rules given as includes."""
+    excludes = (list(DEFAULT_EXCLUDES) if args.default_excludes else []) + args.exclude
+    return WalkFilter(excludes, list(includes) + args.include, not_included)
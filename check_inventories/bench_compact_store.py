@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+"""Measures the memory per row of CompactSums against the list of string quadruples csv_sums used to
+build, on synthetic inventory rows.
+"""
+
+import argparse
+import hashlib
+import tracemalloc
+
+from compact_store import CompactSums
+
+
+def synthetic_rows(rows):
+    """Yields (filename, path, md5, sha3) quadruples with realistic digests and repeated directories."""
+    for n in range(rows):
+        data = str(n).encode()
+        yield (f'file{n % 5000}.tif', f'bag{n // 1000}-tarred/data/DisseminatedContent/file{n % 5000}.tif',
+               hashlib.md5(data).hexdigest(), hashlib.sha3_256(data).hexdigest())
+
+
+def measure(build, rows):
+    """Returns the bytes allocated by build() per row, still held once it returns."""
+    tracemalloc.start()
+    kept = build()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return used / rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory footprint of inventory stores.")
+    parser.add_argument("-n", '--rows', type=int, default=1000000, help="Number of rows (default: 1000000)")
+    args = parser.parse_args()
+    tuples = measure(lambda: list(synthetic_rows(args.rows)), args.rows)
+    compact = measure(lambda: CompactSums(synthetic_rows(args.rows)), args.rows)
+    print(f'{args.rows} rows')
+    print(f'list of tuples: {tuples:.0f} bytes/row')
+    print(f'CompactSums:    {compact:.0f} bytes/row')
+    print(f'Saving: {100 * (1 - compact / tuples):.0f}%')
+
+
+if __name__ == "__main__":
+    main()
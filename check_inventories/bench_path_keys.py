@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+"""Benchmark of truncate_path against the dirname loop csv_sums used before, on synthetic RelPaths shaped
+like a large inventory of unpacked tarred bags. Checks that both give the same answer for every row.
+"""
+
+import argparse
+import random
+from os import path
+from time import perf_counter
+
+from check_inventories import truncate_path
+
+
+def dirname_loop(longpath):
+    """The original per-row path truncation from csv_sums."""
+    shortpath = longpath
+    while '-tarred' in shortpath:
+        shortpath = path.dirname(shortpath)
+    return path.relpath(longpath, shortpath)
+
+
+def synthetic_paths(rows, files_per_dir, seed):
+    """Builds RelPaths under a common root, a third of them inside '-tarred' bag directories."""
+    rng = random.Random(seed)
+    paths = []
+    while len(paths) < rows:
+        depth = rng.randint(1, 6)
+        parts = ['collection'] + [f'dir{rng.randrange(50)}' for _ in range(depth)]
+        if rng.random() < 0.33:
+            parts.insert(rng.randint(1, len(parts)), f'bag{rng.randrange(10000)}-tarred')
+            parts += ['data', 'DisseminatedContent']
+        directory = path.join(*parts)
+        paths.extend(path.join(directory, f'file{n}.dat') for n in range(files_per_dir))
+    return paths[:rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare path truncation methods used by csv_sums.")
+    parser.add_argument("-n", '--rows', type=int, default=1000000, help="Number of rows (default: 1000000)")
+    parser.add_argument('--files-per-dir', type=int, default=20, help="Files in each directory (default: 20)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+    paths = synthetic_paths(args.rows, args.files_per_dir, args.seed)
+    started = perf_counter()
+    old = [dirname_loop(p) for p in paths]
+    old_time = perf_counter() - started
+    prefixes = {}
+    started = perf_counter()
+    new = [truncate_path(p, prefixes) for p in paths]
+    new_time = perf_counter() - started
+    mismatches = sum(1 for a, b in zip(old, new) if a != b)
+    print(f'{len(paths)} rows, {len(prefixes)} distinct directories')
+    print(f'dirname loop:  {old_time:.2f}s ({len(paths) / old_time:,.0f} rows/s)')
+    print(f'truncate_path: {new_time:.2f}s ({len(paths) / new_time:,.0f} rows/s)')
+    print(f'Speed-up: {old_time / new_time:.1f}x, mismatches: {mismatches}')
+
+
+if __name__ == "__main__":
+    main()
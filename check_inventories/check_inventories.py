@@ -5,34 +5,109 @@ Created for Data Services, by L. I. Menzies, 2020-01-09.
 """
 
 import argparse
-import codecs
 import csv
-import tarfile
-from os import linesep, listdir, path
-from sys import exit
+import hashlib
+import sys
+from collections import Counter
+from os import path
+from sys import intern
 from time import strftime
 
+from compact_store import CompactSums, first_positions
 
-def csv_sums(csvfile):
+# Inventories are read through inventory_io from CLIinventory, which sits next to this folder
+sys.path.append(path.join(path.dirname(path.abspath(__file__)), '..', 'CLIinventory'))
+from inventory_io import inventory_fieldnames, read_columns, read_inventory
+
+TARRED = '-tarred'  # Marks the directory of an unpacked tarred bag
+DIFF_COLUMNS = ['change', 'path', 'old_path', 'sha3_256_csv1', 'sha3_256_csv2']
+CHANGES = ('added', 'removed', 'modified', 'moved', 'renamed')
+EMPTY_SHA3 = hashlib.sha3_256(b'').hexdigest()  # Empty files all share it, so it says nothing about moves
+
+
+def root_relative(longpath):
+    """Strips the inventoried directory's own name from the front of a RelPath."""
+    return longpath.partition(path.sep)[2]
+
+
+def truncate_path(longpath, prefixes):
+    """Returns the part of a RelPath from the first '-tarred' directory onwards, or '.' if there is none.
+    The directory part is worked out once per directory and cached, interned, in prefixes.
+    """
+    directory, _, filename = longpath.rpartition(path.sep)
+    trunc_dir = prefixes.get(directory)
+    if trunc_dir is None:
+        marker = directory.find(TARRED)
+        if marker == -1:
+            trunc_dir = ''
+        else:
+            trunc_dir = intern(directory[directory.rfind(path.sep, 0, marker) + 1:])
+        prefixes[directory] = trunc_dir
+    if trunc_dir:
+        return trunc_dir + path.sep + filename
+    return filename if TARRED in filename else '.'
+
+
+def read_digests(digestfile):
+    """Reads a DirDigests csv created by CLIinventory.py into a dictionary of root-relative directory
+    paths and (file count, digest) pairs.
+    """
+    digests = {}
+    with open(digestfile, 'r', newline='') as input_csv:
+        for rows in csv.DictReader(input_csv):
+            digests[root_relative(rows['RelPath'])] = (int(rows['Files']), rows['SHA3_256'])
+    return digests
+
+
+def compare_digests(digests1, digests2):
+    """Compares the directory digests of two inventories. Returns the set of directories in inventory 2
+    whose digests differ (only their own files need checking), and a list of the largest matching
+    subtrees as (directory, file count, digest) triples. Files are matched by name, so a file in one of
+    these directories may have come from anywhere in inventory 1: all of inventory 1 is still read.
+    """
+    changed = set()
+    for dir_path, (files, digest) in digests2.items():
+        other = digests1.get(dir_path)
+        if other is None or other[1] != digest or digest == 'OS Error':
+            changed.add(dir_path)
+    unchanged = [(dir_path, files, digest) for dir_path, (files, digest) in digests2.items()
+                 if dir_path not in changed and (dir_path == '' or path.dirname(dir_path) in changed)]
+    return changed, unchanged
+
+
+def csv_sums(csvfile, dirs=None, subtree=None):
     """Extracts filenames, paths, and checksum hashes from inventory csv created by
-    CLIinventory.py and outputs a list of quadruples.
+    CLIinventory.py and outputs a compact store of quadruples. If a set of root-relative
+    directories is given, only files directly inside them are extracted, and if a
+    subtree is given, only files under it. Fast digests are kept too, if the inventory
+    has them.
     """
-    csv_hashes = []
-    with open(csvfile, 'r', newline='') as input_csv:
-        csv_reader = csv.DictReader(input_csv)
-        for rows in csv_reader:
-            longpath = rows['RelPath']
-            shortpath = longpath
-            while '-tarred' in shortpath:
-                shortpath = path.dirname(shortpath)
-            trunc_path = path.relpath(longpath, shortpath)
-            csv_quadruple = (rows['Filename'], trunc_path, rows['MD5'], rows['SHA3_256'])
-            csv_hashes.append(csv_quadruple)
+    prefixes = {}
+    csv_hashes = CompactSums(fast='FastDigest' in (inventory_fieldnames(csvfile) or []))
+    for rows in read_inventory(csvfile, subtree):
+        longpath = rows['RelPath']
+        if dirs is not None and path.dirname(root_relative(longpath)) not in dirs:
+            continue
+        trunc_path = truncate_path(longpath, prefixes)
+        csv_quadruple = (intern(rows['Filename']), trunc_path, rows['MD5'], rows['SHA3_256'])
+        csv_hashes.append(csv_quadruple, rows.get('FastDigest') or '')
     return csv_hashes
 
 
-def check_sums(csv1sums, csv2sums, logdir):
-    """Compares checksums and outputs logfile of successes and failures."""
+def same_sums(fast1, fast2, md5_1, md5_2, sha3_1, sha3_2):
+    """Whether two files match, by MD5 and SHA3-256. Fast digests are only used for
+    files that lack those on one side, where both inventories have fast digests."""
+    if (not (md5_1 and sha3_1 and md5_2 and sha3_2) and fast1 and fast1 == fast2
+            and fast1 != 'OS Error'):
+        return True
+    return md5_1 == md5_2 and sha3_1 == sha3_2
+
+
+def check_sums(csv1sums, csv2sums, logdir, unchanged=()):
+    """Compares checksums and outputs logfile of successes and failures. Subtrees
+    whose directory digests already match are logged as one row each, with the
+    directory digest in the sha3 columns, and counted as matches.
+    """
     total = 0
     good = 0
     runtime = strftime('%Y%b%d%H%M%S')
@@ -41,17 +116,24 @@ def check_sums(csv1sums, csv2sums, logdir):
     log_writer = csv.DictWriter(logfile, fieldnames=headerow)
     log_writer.writeheader()
     errfile = open(path.join(logdir, f'Unmatched_{runtime}.txt'), 'w')
+    for dir_path, files, digest in unchanged:
+        total += files
+        good += files
+        log_writer.writerow({'filename': '', 'short_path': dir_path or '.', 'md5_csv1': '', 'md5_csv2': '',
+                             'sha3_256_csv1': digest, 'sha3_256_csv2': digest, 'matches (y/n)': 'y',
+                             'timestamp': strftime("%Y-%m-%dT%H:%M:%S-04:00")})
+    positions = first_positions(csv1sums)
     for i in csv2sums:
         found = False
         match = 'n'
-        for t in csv1sums:
-            if i[0] in t and i[1] in t:
-                if i[2] == t[2] and i[3] == t[3]:
-                    good += 1
-                    match = 'y'
-                found = True
-                total += 1
-                break  # Breaks the loop at the first filename and path match
+        position = positions.get((i[0], i[1]))
+        if position is not None:  # The first row with a matching filename and path
+            t = csv1sums[position]
+            if same_sums(i.fast, t.fast, i[2], t[2], i[3], t[3]):
+                good += 1
+                match = 'y'
+            found = True
+            total += 1
         if found == True:
             newrow = {}
             newrow['filename'] = i[0]
@@ -70,22 +152,223 @@ def check_sums(csv1sums, csv2sums, logdir):
     return [total, good]
 
 
+def compare_inventories(csvfile1, csvfile2, logdir, digests=(None, None), subtree=None):
+    """Compares two inventories with check_sums. With a pair of DirDigests csvs, matching subtrees are
+    skipped. Returns [total, good].
+    """
+    changed, unchanged = None, ()
+    if all(digests):
+        changed, unchanged = compare_digests(read_digests(digests[0]), read_digests(digests[1]))
+        print(f'{len(unchanged)} subtrees match, {len(changed)} directories to check file by file.')
+    # Only inventory 2 is pruned, as its files can match a file from any directory of inventory 1
+    csv1_list = csv_sums(csvfile1, None, subtree) if changed != set() else []
+    csv2_list = csv_sums(csvfile2, changed, subtree) if changed != set() else []
+    return check_sums(csv1_list, csv2_list, logdir, unchanged)
+
+
+def stream_sums(csvfile, subtree=None):
+    """Reads an inventory sorted by RelPath one row at a time, yielding the root-relative path and the
+    filename, checksum hashes and fast digest ('' if none) of each file, only under a subtree if one is
+    given. Stops with an error if the rows are out of order.
+    """
+    previous = ''
+    for rows in read_inventory(csvfile, subtree):
+        key = root_relative(rows['RelPath'])
+        if key < previous:
+            raise ValueError(f'{csvfile} is not sorted by RelPath (at {rows["RelPath"]}).')
+        previous = key
+        yield key, (rows['Filename'], path.dirname(key) or '.', rows['MD5'], rows['SHA3_256'],
+                    rows.get('FastDigest') or '')
+
+
+def stream_digests(csvfile, subtree=None):
+    """A leaner stream_sums for going through every row: yields the root-relative path and the MD5, SHA3-256
+    and fast digest ('' if none) of each file, read as plain tuples.
+    """
+    columns = ['RelPath', 'MD5', 'SHA3_256']
+    fast = 'FastDigest' in (inventory_fieldnames(csvfile) or [])
+    if fast:
+        columns.append('FastDigest')
+    previous = ''
+    for row in read_columns(csvfile, columns, subtree):
+        key = row[0].partition(path.sep)[2]
+        if key < previous:
+            raise ValueError(f'{csvfile} is not sorted by RelPath (at {row[0]}).')
+        previous = key
+        yield key, (row[1], row[2], row[3] if fast else '')
+
+
+def merge_sums(csvfile1, csvfile2, logdir, subtree=None):
+    """Compares two inventories sorted by RelPath in a single pass over both, matching files by their
+    path within the inventoried directory. Memory use stays flat however large the inventories are.
+    Outputs the same logfiles as check_sums and returns [total, good, only in 1, only in 2].
+    """
+    total = 0
+    good = 0
+    only1 = 0
+    only2 = 0
+    runtime = strftime('%Y%b%d%H%M%S')
+    headerow = ['filename', 'short_path', 'md5_csv1', 'md5_csv2', 'sha3_256_csv1', 'sha3_256_csv2', 'matches (y/n)', 'timestamp']
+    logfile = open(path.join(logdir, f'Inv_Compare_{runtime}.csv'), 'w')
+    log_writer = csv.DictWriter(logfile, fieldnames=headerow)
+    log_writer.writeheader()
+    errfile = open(path.join(logdir, f'Unmatched_{runtime}.txt'), 'w')
+    stream1 = stream_sums(csvfile1, subtree)
+    stream2 = stream_sums(csvfile2, subtree)
+    t = next(stream1, None)
+    i = next(stream2, None)
+    while t is not None or i is not None:
+        if i is None or (t is not None and t[0] < i[0]):
+            errfile.write(f'Only in inventory 1: {t[1][0]} with path: {t[1][1]}\n')
+            only1 += 1
+            t = next(stream1, None)
+        elif t is None or i[0] < t[0]:
+            errfile.write(f'Could not find match for: {i[1][0]} with path: {i[1][1]}\n')
+            only2 += 1
+            i = next(stream2, None)
+        else:
+            total += 1
+            match = 'n'
+            if same_sums(i[1][4], t[1][4], i[1][2], t[1][2], i[1][3], t[1][3]):
+                good += 1
+                match = 'y'
+            newrow = {}
+            newrow['filename'] = i[1][0]
+            newrow['short_path'] = i[1][1]
+            newrow['md5_csv1'] = t[1][2]
+            newrow['md5_csv2'] = i[1][2]
+            newrow['sha3_256_csv1'] = t[1][3]
+            newrow['sha3_256_csv2'] = i[1][3]
+            newrow['matches (y/n)'] = match
+            newrow['timestamp'] = strftime("%Y-%m-%dT%H:%M:%S-04:00")
+            log_writer.writerow(newrow)
+            t = next(stream1, None)
+            i = next(stream2, None)
+    logfile.close()
+    errfile.close()
+    return [total, good, only1, only2]
+
+
+def content_key(sha3):
+    """The SHA3-256 of a file as raw bytes, for the move index, or None if it can't tell files apart
+    ('OS Error', or the digest of an empty file).
+    """
+    if sha3 == EMPTY_SHA3 or len(sha3) != 64:
+        return None
+    try:
+        return bytes.fromhex(sha3)
+    except ValueError:
+        return None
+
+
+def diff_sums(csvfile1, csvfile2, logdir, subtree=None):
+    """Works out what changed from inventory 1 to inventory 2, both sorted by RelPath. One streaming pass
+    pairs files by path and logs those whose checksums differ as modified. Only the files without a partner
+    are kept in memory: those missing from inventory 2 in an index by SHA3-256, which each file new in
+    inventory 2 is looked up in. A match is a file renamed within its directory or moved to another one;
+    the rest were removed or added. Outputs an Inv_Diff csv with one row per change and returns a Counter
+    of changes, with the unchanged files under 'unchanged'.
+    """
+    counts = Counter()
+    gone = {}  # SHA3-256 bytes: [root-relative path, ...] of files only in inventory 1
+    gone_odd = []  # (path, sha3) of files only in inventory 1 that can't be matched by content
+    new = []  # (path, sha3) of files only in inventory 2
+    diff_path = path.join(logdir, f'Inv_Diff_{strftime("%Y%b%d%H%M%S")}.csv')
+    with open(diff_path, 'w', newline='') as diff_file:
+        diff_writer = csv.writer(diff_file)
+        diff_writer.writerow(DIFF_COLUMNS)
+        stream1 = stream_digests(csvfile1, subtree)
+        stream2 = stream_digests(csvfile2, subtree)
+        t = next(stream1, None)
+        i = next(stream2, None)
+        while t is not None or i is not None:
+            if i is None or (t is not None and t[0] < i[0]):
+                key = content_key(t[1][1])
+                if key is None:
+                    gone_odd.append((t[0], t[1][1]))
+                else:
+                    gone.setdefault(key, []).append(t[0])
+                t = next(stream1, None)
+            elif t is None or i[0] < t[0]:
+                new.append((i[0], i[1][1]))
+                i = next(stream2, None)
+            else:
+                if same_sums(i[1][2], t[1][2], i[1][0], t[1][0], i[1][1], t[1][1]):
+                    counts['unchanged'] += 1
+                else:
+                    counts['modified'] += 1
+                    diff_writer.writerow(['modified', i[0], '', t[1][1], i[1][1]])
+                t = next(stream1, None)
+                i = next(stream2, None)
+        added = []
+        for new_path, sha3 in new:
+            key = content_key(sha3)
+            old_paths = gone.get(key) if key is not None else None
+            if not old_paths:
+                added.append((new_path, sha3))
+                continue
+            # Of several files with the same content, pair files with the same name first
+            name = path.basename(new_path)
+            pick = next((n for n, old in enumerate(old_paths) if path.basename(old) == name), 0)
+            old_path = old_paths.pop(pick)
+            if not old_paths:
+                del gone[key]
+            change = 'renamed' if path.dirname(old_path) == path.dirname(new_path) else 'moved'
+            counts[change] += 1
+            diff_writer.writerow([change, new_path, old_path, sha3, sha3])
+        removed = [(old_path, key.hex()) for key, old_paths in gone.items() for old_path in old_paths]
+        for old_path, sha3 in sorted(removed + gone_odd):
+            counts['removed'] += 1
+            diff_writer.writerow(['removed', '', old_path, sha3, ''])
+        for new_path, sha3 in added:
+            counts['added'] += 1
+            diff_writer.writerow(['added', new_path, '', '', sha3])
+    return counts
+
+
 def main():
     parser = argparse.ArgumentParser(description="Compare filenames and checksums in two inventory CSVs.")
     parser.add_argument("-csv1", '--inventory1', help="Path to inventory 1", required=True)
     parser.add_argument("-csv2", '--inventory2', help="Path to inventory 2", required=True)
     parser.add_argument("-l", '--log', help="Path to directory where log output will be placed", required=True)
+    parser.add_argument("-d1", '--digests1', help="Path to the DirDigests csv of inventory 1")
+    parser.add_argument("-d2", '--digests2', help="Path to the DirDigests csv of inventory 2")
+    parser.add_argument("-s", '--stream', action='store_true',
+                        help="Compare the sorted inventories in a single streaming pass, matching files by path")
+    parser.add_argument("--diff", action='store_true',
+                        help="Write the changes from inventory 1 to inventory 2 (added, removed, modified, moved and "
+                             "renamed files) to an Inv_Diff csv; both must be sorted by RelPath")
+    parser.add_argument("-t", '--subtree',
+                        help="Compare only the files under this directory, relative to the inventoried one")
     args = vars(parser.parse_args())
     in_csv_1 = args["inventory1"]
     in_csv_2 = args["inventory2"]
     log_directory = args["log"]
-    if path.exists(in_csv_1) and path.exists(in_csv_2) and path.isdir(log_directory):
-        csv1_list = csv_sums(in_csv_1)
-        csv2_list = csv_sums(in_csv_2)
-        total_sums, good_sums = check_sums(csv1_list, csv2_list, log_directory)
+    digests = [args["digests1"], args["digests2"]]
+    if any(digests) and not (all(digests) and all(path.exists(d) for d in digests)):
+        print('There was an error with your input. Give both DirDigests files or neither.')
+    elif (args["stream"] or args["diff"]) and any(digests):
+        print('There was an error with your input. DirDigests files cannot be used with --stream or --diff.')
+    elif args["diff"] and path.exists(in_csv_1) and path.exists(in_csv_2) and path.isdir(log_directory):
+        try:
+            changes = diff_sums(in_csv_1, in_csv_2, log_directory, args["subtree"])
+        except ValueError as err:
+            print(f'There was an error with your input. {err}')
+        else:
+            print(f'{changes["unchanged"]} files unchanged, ' + ', '.join(f'{changes[c]} {c}' for c in CHANGES) + '.')
+    elif args["stream"] and path.exists(in_csv_1) and path.exists(in_csv_2) and path.isdir(log_directory):
+        try:
+            total_sums, good_sums, only_1, only_2 = merge_sums(in_csv_1, in_csv_2, log_directory, args["subtree"])
+        except ValueError as err:
+            print(f'There was an error with your input. {err}')
+        else:
+            print(f'Of {str(total_sums)} total hashes checked, {str(good_sums)} were matches.')
+            print(f'{str(only_1)} files only in inventory 1, {str(only_2)} files only in inventory 2.')
+    elif path.exists(in_csv_1) and path.exists(in_csv_2) and path.isdir(log_directory):
+        total_sums, good_sums = compare_inventories(in_csv_1, in_csv_2, log_directory, digests, args["subtree"])
         print(f'Of {str(total_sums)} total hashes checked, {str(good_sums)} were matches.')
     else:
-        print(f'There was an error with your input.')
+        print('There was an error with your input.')
 
 
 if __name__ == "__main__":
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+"""Compact in-memory store for the filename, path, MD5 and SHA3-256 of each inventory row. Digests are kept
+as raw bytes in one bytearray per column (16 and 32 bytes per row instead of 32- and 64-character strings),
+and filenames and paths are interned, so a comparison of tens of millions of rows fits in memory. Inventories
+with a FastDigest column can keep it too, as raw bytes with the algorithm name stored once.
+"""
+
+from sys import intern
+
+MD5_BYTES = 16
+SHA3_BYTES = 32
+
+
+def _pack(column, value, width, odd, row):
+    """Appends a hex digest to a bytearray column. Anything that isn't a lowercase hex digest of the
+    expected width (e.g. 'OS Error') is kept as-is in the odd dictionary instead.
+    """
+    if len(value) == width * 2 and value == value.lower():
+        try:
+            column += bytes.fromhex(value)
+            return
+        except ValueError:
+            pass
+    column += bytes(width)
+    odd[row] = value
+
+
+class SumRecord:
+    """One row of a CompactSums store. Indexes like the (filename, path, md5, sha3) tuples it replaces. The fast
+    digest, if the inventory has one, is only available as the fast attribute ('' otherwise).
+    """
+    __slots__ = ('filename', 'path', 'md5', 'sha3', 'fast')
+
+    def __init__(self, filename, path, md5, sha3, fast=''):
+        self.filename = filename
+        self.path = path
+        self.md5 = md5
+        self.sha3 = sha3
+        self.fast = fast
+
+    def __getitem__(self, n):
+        return (self.filename, self.path, self.md5, self.sha3)[n]
+
+    def __iter__(self):
+        return iter((self.filename, self.path, self.md5, self.sha3))
+
+    def __len__(self):
+        return 4
+
+
+class CompactSums:
+    """Column store of (filename, path, md5, sha3) quadruples. Behaves as a read-only sequence of
+    SumRecords, so code written for lists of quadruples works on it unchanged.
+    """
+    __slots__ = ('filenames', 'paths', 'md5s', 'sha3s', 'odd_md5', 'odd_sha3', 'fast', 'fast_algorithm',
+                 'fast_width', 'fasts', 'odd_fast')
+
+    def __init__(self, quadruples=(), fast=False):
+        self.filenames = []
+        self.paths = []
+        self.md5s = bytearray()
+        self.sha3s = bytearray()
+        self.odd_md5 = {}
+        self.odd_sha3 = {}
+        self.fast = fast  # Whether rows carry a fast digest
+        self.fast_algorithm = None  # Taken from the first fast digest; others are kept in odd_fast
+        self.fast_width = 0
+        self.fasts = bytearray()
+        self.odd_fast = {}
+        for quadruple in quadruples:
+            self.append(quadruple)
+
+    def append(self, quadruple, fast=''):
+        filename, path, md5, sha3 = quadruple
+        row = len(self.filenames)
+        self.filenames.append(intern(filename))
+        self.paths.append(intern(path))
+        _pack(self.md5s, md5, MD5_BYTES, self.odd_md5, row)
+        _pack(self.sha3s, sha3, SHA3_BYTES, self.odd_sha3, row)
+        if self.fast:
+            algorithm, _, digest = fast.partition(':')
+            if self.fast_algorithm is None:
+                if not digest:
+                    self.odd_fast[row] = fast
+                    return
+                self.fast_algorithm = algorithm
+                self.fast_width = len(digest) // 2
+                self.fasts += bytes(row * self.fast_width)  # Room for the rows before the first digest
+            if algorithm == self.fast_algorithm:
+                _pack(self.fasts, digest, self.fast_width, self.odd_fast, row)
+            else:
+                self.fasts += bytes(self.fast_width)
+            if algorithm != self.fast_algorithm or row in self.odd_fast:
+                self.odd_fast[row] = fast  # Kept whole, with its algorithm
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError('CompactSums index out of range')
+        md5 = self.odd_md5.get(row)
+        if md5 is None:
+            md5 = self.md5s[row * MD5_BYTES:(row + 1) * MD5_BYTES].hex()
+        sha3 = self.odd_sha3.get(row)
+        if sha3 is None:
+            sha3 = self.sha3s[row * SHA3_BYTES:(row + 1) * SHA3_BYTES].hex()
+        fast = ''
+        if self.fast:
+            fast = self.odd_fast.get(row)
+            if fast is None:
+                fast = f'{self.fast_algorithm}:{self.fasts[row * self.fast_width:(row + 1) * self.fast_width].hex()}'
+        return SumRecord(self.filenames[row], self.paths[row], md5, sha3, fast)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+
+def first_positions(sums):
+    """Maps each (filename, path) pair to the position of its first row, for constant-time lookups."""
+    if isinstance(sums, CompactSums):
+        pairs = zip(sums.filenames, sums.paths)
+    else:
+        pairs = ((record[0], record[1]) for record in sums)
+    positions = {}
+    for row, pair in enumerate(pairs):
+        positions.setdefault(pair, row)
+    return positions
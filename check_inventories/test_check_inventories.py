@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+"""Tests for check_inventories.py. Run with: python3 -m unittest discover check_inventories"""
+
+import sys
+import tempfile
+import unittest
+from os import makedirs, remove, rmdir
+from os.path import abspath, dirname, join
+
+sys.path.append(dirname(abspath(__file__)))
+sys.path.append(join(dirname(abspath(__file__)), '..', 'CLIinventory'))
+from CLIinventory import run_inventory, sort_with_digests
+from check_inventories import compare_inventories, same_sums
+
+
+def write_file(filepath, text):
+    makedirs(dirname(filepath), exist_ok=True)
+    with open(filepath, 'w') as out_file:
+        out_file.write(text)
+
+
+def inventory(root, outdir):
+    """Inventories root into outdir and returns the sorted inventory and its DirDigests csv."""
+    makedirs(outdir)
+    inventory_csv = sort_with_digests(run_inventory(root, outdir, progress=False), root)
+    return inventory_csv, join(outdir, 'DirDigests_' + inventory_csv.rpartition('Inventory_')[2])
+
+
+class DigestModeTest(unittest.TestCase):
+
+    def test_file_moved_out_of_deleted_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = join(tmp, 'root')
+            for name in ('a/x.txt', 'a/b/y.txt', 'a/b/z.txt', 'c/u.txt', 'c/v.txt', 'd/w.txt', 't.txt'):
+                write_file(join(root, name), name)
+            csv1, digests1 = inventory(root, join(tmp, 'out1'))
+            # Move a/b/y.txt to e/y.txt and delete a/b
+            write_file(join(root, 'e', 'y.txt'), 'a/b/y.txt')
+            write_file(join(root, 'a', 'z.txt'), 'a/b/z.txt')
+            for name in ('a/b/y.txt', 'a/b/z.txt'):
+                remove(join(root, name))
+            rmdir(join(root, 'a', 'b'))
+            csv2, digests2 = inventory(root, join(tmp, 'out2'))
+
+            makedirs(join(tmp, 'plain'))
+            self.assertEqual(compare_inventories(csv1, csv2, join(tmp, 'plain')), [7, 7])
+            makedirs(join(tmp, 'digests'))
+            self.assertEqual(compare_inventories(csv1, csv2, join(tmp, 'digests'), (digests1, digests2)), [7, 7])
+
+
+class SameSumsTest(unittest.TestCase):
+
+    def test_fast_digest_does_not_override_checksums(self):
+        self.assertFalse(same_sums('xxh3:ab', 'xxh3:ab', 'md5a', 'md5b', 'sha3a', 'sha3a'))
+        self.assertTrue(same_sums('xxh3:ab', 'xxh3:cd', 'md5a', 'md5a', 'sha3a', 'sha3a'))
+
+    def test_fast_digest_used_when_checksums_missing(self):
+        self.assertTrue(same_sums('xxh3:ab', 'xxh3:ab', '', 'md5a', '', 'sha3a'))
+        self.assertFalse(same_sums('xxh3:ab', 'xxh3:cd', '', 'md5a', '', 'sha3a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
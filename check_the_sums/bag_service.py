@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+"""Long-lived check_sums service. `bag_service.py serve` loads and indexes the FedoraRepo master csv once, then answers
+validation requests on a Unix socket, so each bag delivery is checked without starting Python and re-reading the
+spreadsheet. The spreadsheet is reloaded when its modification time changes. `bag_service.py check` sends one request
+and prints the same output, and writes the same log, as check_sums; `status` and `stop` query and end the service.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import socket
+import socketserver
+from os import chmod, cpu_count, environ, getuid, makedirs, path, remove, stat
+from sys import exit
+from time import monotonic, strftime
+
+from bag_validation import DEFAULT_VERSION, LAYOUTS, BagValidationError, bag_sums, check_sums, csv_sums, first_rows
+
+# Private to the user: in their runtime directory, or else in a directory of their own under /tmp
+DEFAULT_SOCKET = path.join(environ.get('XDG_RUNTIME_DIR') or f'/tmp/check_sums-{getuid()}', 'check_sums.sock')
+
+
+class MasterIndex:
+    """The rows of the master csv and their index by filename and id, reloaded when the file changes."""
+
+    def __init__(self, csvfile, workers=1):
+        self.csvfile = csvfile
+        self.workers = workers
+        self.mtime = None
+        self.loaded = None
+        self.rows = []
+        self.index = {}
+        self.refresh()
+
+    def refresh(self):
+        """Reloads the csv if its modification time has changed since it was loaded. Raises OSError if it can't be
+        read, in which case the rows already loaded are kept.
+        """
+        mtime = stat(self.csvfile).st_mtime_ns  # Taken first, so a change made while loading is picked up next time
+        if mtime == self.mtime:
+            return
+        started = monotonic()
+        rows = csv_sums(self.csvfile, self.workers)
+        self.rows, self.index = rows, first_rows(rows)
+        self.mtime = mtime
+        self.loaded = strftime('%Y-%m-%d %H:%M:%S')
+        print(f'Loaded {len(self.rows)} rows from {self.csvfile} in {monotonic() - started:.1f}s.')
+
+
+def run_request(master, request):
+    """Carries out one request and returns the reply. Anything check_sums would print is returned as the output."""
+    command = request.get('command')
+    if command == 'status':
+        return {'output': f'Serving {master.csvfile}: {len(master.rows)} rows, loaded {master.loaded}.\n'}
+    if command != 'check':
+        return {'error': f'Unknown command: {command}'}
+    layout = LAYOUTS.get(request.get('layout') or DEFAULT_VERSION)
+    bags_dir = request.get('bags') or ''
+    log_directory = request.get('log') or ''
+    if layout is None or not path.isdir(bags_dir) or not path.isdir(log_directory):
+        return {'error': 'There was an error with your input.'}
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            master.refresh()
+        except OSError as err:
+            print(f'Warning: could not reload the spreadsheet, using the copy loaded {master.loaded}: {err}')
+        try:
+            total, good = check_sums(master.rows, bag_sums(bags_dir, layout), log_directory, layout, master.index)
+        except BagValidationError as err:
+            return {'output': output.getvalue(), 'error': str(err), 'bag': err.bag}
+        except Exception as err:  # An unreadable bag or log directory must not take the service down
+            return {'output': output.getvalue(), 'error': f'Error checking {bags_dir}: {err!r}'}
+    return {'output': output.getvalue(), 'total': total, 'good': good}
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Reads one JSON request line and writes one JSON reply line."""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError as err:
+            request, reply = {}, {'error': f'Bad request: {err}'}
+        else:
+            if request.get('command') == 'stop':
+                self.server.stopping = True
+                reply = {'output': 'Stopping.\n'}
+            else:
+                reply = run_request(self.server.master, request)
+        self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+        if request.get('command') != 'check':
+            return
+        if 'bag' in reply:
+            result = f'error in bag <{reply["bag"]}>'
+        else:
+            result = reply.get('error') or f'{reply["good"]} of {reply["total"]} matched'
+        print(f'{strftime("%Y-%m-%d %H:%M:%S")} {request.get("bags")}: {result}')
+
+
+def send(socket_path, request):
+    """Sends one request to the service and returns its reply. Raises OSError if the service can't be reached and
+    ValueError if its reply is empty or isn't a JSON object.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with client.makefile('rb') as replies:
+            line = replies.readline()
+    if not line.strip():
+        raise ValueError('the service closed the connection without replying')
+    reply = json.loads(line)
+    if not isinstance(reply, dict):
+        raise ValueError(f'unexpected reply: {line[:200]!r}')
+    return reply
+
+
+def private_dir(socket_path):
+    """Creates the directory of a socket, usable only by this user, if it doesn't exist. Returns False if the
+    directory belongs to another user or others can get into it, so the socket could be someone else's.
+    """
+    directory = path.dirname(socket_path)
+    makedirs(directory, mode=0o700, exist_ok=True)
+    info = stat(directory)
+    return info.st_uid == getuid() and not info.st_mode & 0o077
+
+
+def serve(csvfile, socket_path, workers=1):
+    """Loads the spreadsheet and answers requests, one at a time, until a stop request or Ctrl-C."""
+    if path.exists(socket_path):
+        try:
+            send(socket_path, {'command': 'status'})
+        except OSError:
+            remove(socket_path)  # Left behind by a service that didn't shut down cleanly
+        except ValueError:
+            print(f'Error: something other than this service is listening on {socket_path}.\nQuitting...')
+            return
+        else:
+            print(f'Error: a service is already listening on {socket_path}.\nQuitting...')
+            return
+    master = MasterIndex(csvfile, workers)
+    with socketserver.UnixStreamServer(socket_path, RequestHandler) as server:
+        chmod(socket_path, 0o600)
+        server.master = master
+        server.stopping = False
+        print(f'Listening on {socket_path}')
+        try:
+            while not server.stopping:
+                server.handle_request()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            remove(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the FedoraRepo master spreadsheet loaded in a local service and "
+                                                 "check bag deliveries against it.")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help=f"Path of the Unix socket (default: {DEFAULT_SOCKET})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serving = commands.add_parser('serve', help="Load the spreadsheet and answer requests until stopped")
+    serving.add_argument("-s", '--spreadsheet', help="Path to input spreadsheet", required=True)
+    serving.add_argument("-w", '--workers', type=int, default=min(4, cpu_count() or 1),
+                         help="Processes used to parse a large spreadsheet (default: up to 4)")
+    checking = commands.add_parser('check', help="Check a directory of bags against the loaded spreadsheet")
+    checking.add_argument("-b", '--bags', help="Path to directory of bagged objects", required=True)
+    checking.add_argument("-l", '--log', help="Path to directory where the log will be placed", required=True)
+    checking.add_argument('--layout', choices=sorted(LAYOUTS), default=DEFAULT_VERSION,
+                          help=f"check_sums version whose bag layout and log format to use (default: "
+                               f"{DEFAULT_VERSION})")
+    commands.add_parser('status', help="Show which spreadsheet is loaded")
+    commands.add_parser('stop', help="Stop the service")
+    args = parser.parse_args()
+    if args.socket == DEFAULT_SOCKET and not private_dir(args.socket):
+        print(f'Error: {path.dirname(args.socket)} belongs to another user or is open to others.\nQuitting...')
+        exit(1)
+    if args.command == 'serve':
+        if not path.exists(args.spreadsheet):
+            print('There was an error with your input.')
+            return
+        serve(args.spreadsheet, args.socket, args.workers)
+        return
+    request = {'command': args.command}
+    if args.command == 'check':
+        # The service doesn't share this working directory
+        request.update(bags=path.abspath(args.bags), log=path.abspath(args.log), layout=args.layout)
+    try:
+        reply = send(args.socket, request)
+    except OSError as err:
+        print(f'Error: could not reach the check_sums service on {args.socket}: {err}\nQuitting...')
+        exit(1)
+    except ValueError as err:
+        print(f'Error: bad reply from the check_sums service on {args.socket}: {err}\nQuitting...')
+        exit(1)
+    print(reply.get('output', ''), end='')
+    if 'bag' in reply:
+        print(f'**** There was an error in bag <{reply["bag"]}>. ****\n'
+              f'{reply["error"]}\n'
+              f'Quitting...\n')
+        exit(1)
+    if 'error' in reply:
+        print(reply['error'])
+        exit(1)
+    if args.command == 'check':
+        print(f'Of {str(reply["total"])} total hashes checked, {str(reply["good"])} were matches.')
+
+
+if __name__ == "__main__":
+    main()
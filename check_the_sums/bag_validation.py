@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+
+"""Validation engine behind check_sums 1.0.0-1.0.4: compares filenames and checksums from the FedoraRepo master csv
+with the metadata in tarred, bagged data sets. The differences between the versions (which metadata files and content
+folders a bag has, which checks are made, and the log format) are described by a Layout, so every version runs on the
+same scanning and indexing code.
+Created for Data Services, by L. I. Menzies, 2019-07-22.
+"""
+
+import argparse
+import codecs
+import csv
+import io
+import tarfile
+import threading
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import chain
+from mmap import ACCESS_READ, mmap
+from os import cpu_count, listdir, path, replace
+from sys import exit
+from time import strftime
+
+from bagit_manifest import manifest_algorithm, read_manifest
+
+# metadata_kinds: words in the name of the DisseminatedMetadata csv(s) that are read
+# content_dirs: folders whose files must match the DisseminatedMetadata rows (none: not checked)
+# check_manifest: check the file count and md5s against manifest-md5.txt
+# check_sha512: check that manifest-sha512.txt lists as many files as manifest-md5.txt
+# split_pipe: keep only the part of a filename before a '|'
+# log_by_bag: log one row per bagged file, with the bag name (otherwise one row per spreadsheet row, as in 1.0.0)
+Layout = namedtuple('Layout', ['metadata_kinds', 'content_dirs', 'check_manifest', 'check_sha512', 'split_pipe',
+                               'log_by_bag'])
+CONTENT_DIRS = ('DisseminationContent', 'DisseminatedContent')
+LAYOUTS = {
+    '1.0.0': Layout(('generic',), (), False, False, False, False),
+    '1.0.1': Layout(('generic',), (), True, False, False, True),
+    '1.0.2': Layout(('generic',), CONTENT_DIRS, True, False, False, True),
+    '1.0.3': Layout(('generic', 'items'), CONTENT_DIRS, True, False, False, True),
+    '1.0.4': Layout(('generic', 'items'), CONTENT_DIRS, True, True, True, True),
+}
+DEFAULT_VERSION = '1.0.4'
+
+PARALLEL_MIN_BYTES = 64 * 2 ** 20  # Smaller spreadsheets are parsed in one process
+STOP_CHECK_ROWS = 65536  # Rows parsed between checks for a request to stop
+
+
+def record_ranges(csvfile, parts):
+    """Splits a csv file into about `parts` byte ranges that each hold whole records, after the header row.
+    A newline ends a record only if an even number of quote characters comes before it, so ranges never
+    split a quoted field that contains line breaks. Returns the header's end offset and the list of ranges.
+    """
+    with open(csvfile, 'rb') as in_file, mmap(in_file.fileno(), 0, access=ACCESS_READ) as data:
+        size = len(data)
+        counted = 0  # Quotes are counted up to this offset
+        quotes = 0
+        ends = []
+        for target in [0] + [size * k // parts for k in range(1, parts)]:
+            newline = data.find(b'\n', max(target, ends[-1] if ends else 0))
+            while newline != -1:
+                quotes += data[counted:newline].count(b'"')
+                counted = newline
+                if quotes % 2 == 0:
+                    break
+                newline = data.find(b'\n', newline + 1)
+            if newline == -1:
+                break
+            ends.append(newline + 1)
+    header_end = ends[0] if ends else size
+    bounds = ends + [size]
+    return header_end, [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _parse_range(csvfile, start, end, fieldnames):
+    """Parses the records between two byte offsets of the master csv into quadruples (runs in a worker)."""
+    with open(csvfile, 'rb') as in_file:
+        in_file.seek(start)
+        text = in_file.read(end - start).decode('utf-8')
+    csv_reader = csv.DictReader(io.StringIO(text, newline=''), fieldnames=fieldnames)
+    return [(rows['filename'], rows['id'], rows['original_checksum'], 'n/a') for rows in csv_reader]
+
+
+def csv_sums(csvfile, workers=1, stop=None):
+    """Extracts filenames, ids, and checksum hashes from the FedoraRepo master csv metadata file  and outputs a list of
+    quadruples. Large files are split at record boundaries and parsed by several worker processes. If stop (a
+    threading.Event) is set, parsing is abandoned and only the rows read so far are returned.
+    """
+    csv_hashes = []
+    if workers <= 1 or path.getsize(csvfile) < PARALLEL_MIN_BYTES:
+        with open(csvfile, 'r', newline='') as input_csv:
+            csv_reader = csv.DictReader(input_csv)
+            for n, rows in enumerate(csv_reader):
+                if stop is not None and n % STOP_CHECK_ROWS == 0 and stop.is_set():
+                    break
+                csv_quadruple = (rows['filename'], rows['id'], rows['original_checksum'], 'n/a')
+                csv_hashes.append(csv_quadruple)
+        return csv_hashes
+    header_end, ranges = record_ranges(csvfile, workers * 4)
+    with open(csvfile, 'rb') as in_file:
+        header = in_file.read(header_end).decode('utf-8')
+    fieldnames = next(csv.reader(io.StringIO(header, newline='')))
+    # Imported here: it loads multiprocessing, which more than doubles startup for runs that don't need it
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = [pool.submit(_parse_range, csvfile, start, end, fieldnames) for start, end in ranges]
+        for part in parts:
+            if stop is not None and stop.is_set():
+                for pending in parts:
+                    pending.cancel()  # Those already running are left to finish
+                break
+            csv_hashes.extend(part.result())
+    return csv_hashes
+
+
+class BagValidationError(Exception):
+    """A bag whose contents don't agree with its own manifests or metadata."""
+
+    def __init__(self, bag, message):
+        super().__init__(message)
+        self.bag = bag
+
+
+def scan_bag(item_path, item, layout):
+    """Extracts filenames, ids, checksum hashes, and the bag name from the DisseminatedMetadata csv of one tarred bag,
+    and (depending on the layout) checks the file counts and md5 sums against the BagIt manifests. Outputs the
+    DisseminatedMetadata quadruples and the counts, or raises BagValidationError.
+    """
+    bagit_hashes = {}  # First md5 in the manifest for each filename
+    dissem_mdata = []
+    counts = {'bag': 0, 'md5': 0, 'sha512': None, 'content': 0, 'metadata': 0}
+    with tarfile.open(item_path) as tar:
+        for member in tar.getmembers():
+            if not member.isreg():  # Ignore directories
+                continue
+            fname = member.name
+            basename = path.basename(fname)
+            if 'data' in fname:
+                counts['bag'] += 1
+            for content_dir in layout.content_dirs:
+                if content_dir in fname and not 'DisseminatedMetadata' in fname:
+                    counts['content'] += 1
+            algorithm = manifest_algorithm(fname)
+            if algorithm == 'md5' and layout.check_manifest:
+                for file_path, md5 in read_manifest(tar.extractfile(member), algorithm):
+                    counts['md5'] += 1
+                    bagit_hashes.setdefault(path.basename(file_path), md5)
+            elif algorithm == 'sha512' and layout.check_sha512:
+                counts['sha512'] = sum(1 for _ in read_manifest(tar.extractfile(member), algorithm))
+            elif 'DisseminatedMetadata' in basename and any(kind in basename for kind in layout.metadata_kinds):
+                metadata = codecs.getreader("utf-8")(tar.extractfile(member))
+                for rows in csv.DictReader(metadata):
+                    counts['metadata'] += 1
+                    filename = rows['filename']
+                    if layout.split_pipe and '|' in filename:
+                        filename = filename.split('|')[0]
+                    dissem_mdata.append((filename, rows['id'], rows['checksum'], item))
+    if layout.check_manifest and not counts['bag'] == counts['md5']:
+        raise BagValidationError(item, f'No. of files in bag: {counts["bag"]}, \n'
+                                       f'No. in BagIt manifest: {counts["md5"]}, ')
+    if counts['sha512'] is not None and not counts['sha512'] == counts['md5']:
+        raise BagValidationError(item, f'No. in BagIt md5 manifest: {counts["md5"]}, \n'
+                                       f'No. in BagIt sha512 manifest: {counts["sha512"]}, ')
+    if layout.content_dirs and not counts['metadata'] == counts['content']:
+        raise BagValidationError(item, f'Number of files in DisseminatedMetadata: {counts["metadata"]}\n'
+                                       f'No. in data/DisseminatedContent/: {counts["content"]}')
+    # Compare the checksums in the DisseminatedMetadata file with the one in the BagIt 'manifest-md5.txt' file
+    if layout.check_manifest:
+        for ck in dissem_mdata:
+            bagit_md5 = bagit_hashes.get(ck[0])
+            if bagit_md5 is None:
+                raise BagValidationError(item, f'The file: {ck[0]}\n'
+                                               f'was not found in the BagIt manifest file.')
+            elif not ck[2] == bagit_md5:
+                raise BagValidationError(item, f'The md5 in the BagIt manifest for file: {ck[0]} ({ck[2]})\n'
+                                               f'does not match the one in the DisseminatedMetadata file '
+                                               f'({bagit_md5}).')
+    return dissem_mdata, counts
+
+
+def bag_sums(bagdir, layout):
+    """Scans each tarred bag in turn, prints its file counts and yields its list of DisseminatedMetadata quadruples as
+    soon as the bag has been checked, so only one bag's metadata is held at a time. Raises BagValidationError (or
+    ValueError for a malformed manifest) at the first bad bag.
+    """
+    for item in listdir(bagdir):
+        item_path = path.join(bagdir, item)
+        if path.splitext(item)[-1] == '.tar':
+            try:
+                dissem_mdata, counts = scan_bag(item_path, item, layout)
+            except ValueError as err:
+                raise BagValidationError(item, str(err))
+            summary = f'----- {item} -----\nTotal files in bag: {counts["bag"]}'
+            if layout.check_manifest:
+                summary += f'\nTotal files in BagIt manifest: {counts["md5"]}'
+            if counts['sha512'] is not None:
+                summary += f'\nTotal files in BagIt sha512 manifest: {counts["sha512"]}'
+            if layout.content_dirs:
+                summary += f'\nNo. files in DisseminatedContent: {counts["content"]}'
+            print(f'{summary}\nNo. files in DisseminatedMetadata: {counts["metadata"]}')
+            yield dissem_mdata
+
+
+def first_rows(sums):
+    """Maps each (filename, id) pair to its first quadruple, for constant-time lookups."""
+    index = {}
+    for t in sums:
+        index.setdefault((t[0], t[1]), t)
+    return index
+
+
+def reconcile_bag(bag, csv_index, log_writer):
+    """Looks up one bag's files in the csv index, writes their log rows in one batch, and prints any checksum that
+    doesn't match right away. Returns the number of files found and the number that matched.
+    """
+    total = 0
+    good = 0
+    timestamp = strftime("%Y-%m-%dT%H:%M:%S-04:00")
+    log_rows = []
+    for i in bag:
+        t = csv_index.get((i[0], i[1]))
+        if t is None:
+            continue
+        total += 1
+        if i[2] == t[2]:
+            good += 1
+            match = 'y'
+        else:
+            match = 'n'
+            print(f'**** Checksum mismatch in bag <{i[3]}>: {i[0]} (id {i[1]}) ****\n'
+                  f'FedoraRepo: {t[2]}, bagged: {i[2]}')
+        log_rows.append([i[0], i[3], i[1], t[2], i[2], match, timestamp])
+    log_writer.writerows(log_rows)
+    return total, good
+
+
+def reconcile_spreadsheet(csvsums, bag_index, log_writer):
+    """The 1.0.0 log: looks up each spreadsheet row in the index of every bagged file. Returns the number of rows
+    found and the number that matched.
+    """
+    total = 0
+    good = 0
+    timestamp = strftime("%Y-%m-%dT%H:%M:%S-04:00")
+    log_rows = []
+    for i in csvsums:
+        t = bag_index.get((i[0], i[1]))
+        if t is None:
+            continue
+        total += 1
+        if i[2] == t[2]:
+            good += 1
+            match = 'y'
+        else:
+            match = 'n'
+            print(f'**** Checksum mismatch in bag <{t[3]}>: {i[0]} (id {i[1]}) ****\n'
+                  f'FedoraRepo: {i[2]}, bagged: {t[2]}')
+        log_rows.append([i[0], i[1], i[2], t[2], match, timestamp])
+    log_writer.writerows(log_rows)
+    return total, good
+
+
+def check_sums(csvsums, bagsums, logdir, layout=LAYOUTS[DEFAULT_VERSION], csv_index=None):
+    """Compares checksums and outputs logfile of successes and failures. With a log_by_bag layout each bag is
+    reconciled as soon as it is scanned. csvsums may be a Future that is still loading the spreadsheet; bags that
+    finish scanning before it is ready are held until it is. An index of csvsums from first_rows that has already
+    been built can be passed as csv_index. The log is written as a .part file and renamed once every bag has been
+    checked; if a bag fails validation, it is renamed Checksums_Log_<datetime>_incomplete.csv instead.
+    """
+    runtime = strftime('%Y%b%d%H%M%S')
+    log_path = path.join(logdir, f'Checksums_Log_{runtime}.csv')
+    logfile = open(log_path + '.part', 'w', newline='')
+    try:
+        with logfile:
+            result = _log_sums(csvsums, bagsums, logfile, layout, csv_index)
+    except BaseException:
+        replace(log_path + '.part', path.join(logdir, f'Checksums_Log_{runtime}_incomplete.csv'))
+        raise
+    replace(log_path + '.part', log_path)
+    return result
+
+
+def _log_sums(csvsums, bagsums, logfile, layout, csv_index):
+    """Writes the checksum log for check_sums and returns [total, good]."""
+    log_writer = csv.writer(logfile)
+    if not layout.log_by_bag:
+        log_writer.writerow(['filename', 'file_id', 'fedora_checksum', 'bagged_checksum', 'matches (y/n)',
+                             'timestamp'])
+        bag_index = first_rows(chain.from_iterable(bagsums))
+        total, good = reconcile_spreadsheet(csvsums.result() if isinstance(csvsums, Future) else csvsums,
+                                            bag_index, log_writer)
+        return [total, good]
+    log_writer.writerow(['filename', 'bag_name', 'file_id', 'fedora_checksum', 'bagged_checksum',
+                         'matches (y/n)', 'timestamp'])
+    total = 0
+    good = 0
+    # csv_index: first csv row for each filename and id
+    waiting = []  # Bags scanned before the index was ready
+    for bag in chain(bagsums, [None]):
+        if bag is not None:
+            waiting.append(bag)
+            if csv_index is None and isinstance(csvsums, Future) and not csvsums.done():
+                continue
+        if csv_index is None:
+            csv_index = first_rows(csvsums.result() if isinstance(csvsums, Future) else csvsums)
+        for waiting_bag in waiting:
+            bag_total, bag_good = reconcile_bag(waiting_bag, csv_index, log_writer)
+            total += bag_total
+            good += bag_good
+        waiting = []
+        logfile.flush()
+    return [total, good]
+
+
+def validate(in_csv, bags_dir, log_directory, layout=LAYOUTS[DEFAULT_VERSION], workers=1):
+    """Checks every bag in bags_dir against the spreadsheet, parsing the spreadsheet in the background while the bags
+    are scanned. Returns the number of hashes checked and the number that matched.
+    """
+    stop = threading.Event()
+    loader = ThreadPoolExecutor(max_workers=1)
+    csv_future = loader.submit(csv_sums, in_csv, workers, stop)
+    try:
+        result = check_sums(csv_future, bag_sums(bags_dir, layout), log_directory, layout)
+    except BaseException:
+        # Report a bad bag straight away, rather than after the spreadsheet has been parsed
+        stop.set()
+        csv_future.cancel()
+        loader.shutdown(wait=False)
+        raise
+    loader.shutdown()
+    return result
+
+
+def main(version=None):
+    parser = argparse.ArgumentParser(description="Compare filenames and checksums from a master metadata spreadsheet, "
+                                                 "output from FedoraRepo, with metadata extracted from bagged objects, "
+                                                 "to ensure that items sent to Preservation are identical with those in"
+                                                 " the repository.")
+    parser.add_argument("-s", '--spreadsheet', help="Path to input spreadsheet", required=True)
+    parser.add_argument("-b", '--bags', help="Path to directory of bagged objects", required=True)
+    parser.add_argument("-l", '--log', help="Path to directory where the log will be placed", required=True)
+    parser.add_argument("-w", '--workers', type=int, default=min(4, cpu_count() or 1),
+                        help="Processes used to parse a large spreadsheet (default: up to 4)")
+    if version is None:
+        parser.add_argument('--layout', choices=sorted(LAYOUTS), default=DEFAULT_VERSION,
+                            help=f"check_sums version whose bag layout and log format to use (default: "
+                                 f"{DEFAULT_VERSION})")
+    args = vars(parser.parse_args())
+    in_csv = args["spreadsheet"]
+    bags_dir = args["bags"]
+    log_directory = args["log"]
+    layout = LAYOUTS[version or args["layout"]]
+    if path.exists(in_csv) and path.isdir(bags_dir) and path.isdir(log_directory):
+        try:
+            total_sums, good_sums = validate(in_csv, bags_dir, log_directory, layout, args["workers"])
+        except BagValidationError as err:
+            print(f'**** There was an error in bag <{err.bag}>. ****\n'
+                  f'{err}\n'
+                  f'Quitting...\n')
+            exit()
+        print(f'Of {str(total_sums)} total hashes checked, {str(good_sums)} were matches.')
+    else:
+        print('There was an error with your input.')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+"""Fast parser for BagIt payload manifests (manifest-md5.txt, manifest-sha512.txt, etc.). Manifests are read in
+large blocks and each block is split into (path, digest) records with one regular expression, instead of line by
+line. Follows the BagIt spec (RFC 8493): the digest and path are separated by one or more spaces or tabs, lines end
+in LF, CR or CRLF, and CR, LF and % in a path are percent-encoded as %0D, %0A and %25.
+"""
+
+import re
+
+CHUNK_SIZE = 4 * 2 ** 20  # Bytes read from the manifest at a time
+DIGEST_LENGTHS = {'md5': 32, 'sha1': 40, 'sha256': 64, 'sha512': 128}
+MANIFEST_NAME = re.compile(r'(?:^|/)manifest-(\w+)\.txt$')
+LINE = re.compile(r'^[ \t]*([0-9A-Fa-f]+)[ \t]+(.+)$', re.M)
+ESCAPE = re.compile(r'%(0[DdAa]|25)')
+UNESCAPED = {'0D': '\r', '0d': '\r', '0A': '\n', '0a': '\n', '25': '%'}
+
+
+def manifest_algorithm(name):
+    """Returns the algorithm of a payload manifest from its name (e.g. 'md5' for bag/manifest-md5.txt), or None if
+    the name is not a payload manifest. Tag manifests are not payload manifests.
+    """
+    found = MANIFEST_NAME.search(name)
+    return found.group(1).lower() if found else None
+
+
+def _unescape(filepath):
+    return ESCAPE.sub(lambda m: UNESCAPED[m.group(1)], filepath)
+
+
+def parse_manifest_text(text, algorithm=None):
+    """Splits manifest text with LF line endings into a list of (path, digest) records. Raises ValueError on a line
+    that isn't a digest followed by a path, or a digest of the wrong length for the algorithm.
+    """
+    records = [(filepath, digest) for digest, filepath in LINE.findall(text)]
+    width = DIGEST_LENGTHS.get(algorithm)
+    lines = text.count('\n') + (not text.endswith('\n'))
+    if len(records) != lines or (width and any(len(d) != width for _, d in records)):
+        for line in text.split('\n'):  # Slow path: blank lines are allowed, anything else is an error
+            found = LINE.match(line)
+            if line.strip() and (not found or (width and len(found.group(1)) != width)):
+                raise ValueError(f'Malformed {algorithm or "BagIt"} manifest line: {line!r}')
+    if '%' in text:
+        records = [(_unescape(filepath), digest) if '%' in filepath else (filepath, digest)
+                   for filepath, digest in records]
+    return records
+
+
+def read_manifest(stream, algorithm=None, chunk_size=CHUNK_SIZE):
+    """Yields the (path, digest) records of a manifest read from a binary file object, such as the one returned by
+    TarFile.extractfile. Paths are relative to the bag, e.g. 'data/DisseminatedContent/file.tif'.
+    """
+    leftover = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        block = leftover + chunk
+        if chunk:
+            cut = max(block.rfind(b'\n'), block.rfind(b'\r')) + 1  # Only whole lines are parsed
+            block, leftover = block[:cut], block[cut:]
+        if b'\r' in block:
+            block = block.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        if block:
+            yield from parse_manifest_text(block.decode('utf-8'), algorithm)
+        if not chunk:
+            break
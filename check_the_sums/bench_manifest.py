@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+"""Benchmark for bagit_manifest.read_manifest against the line-by-line parsing used in check_sums 1.0.0-1.0.4.
+Builds md5 and sha512 manifests of synthetic paths in memory, parses each both ways and checks that the results
+agree.
+"""
+
+import argparse
+import codecs
+import hashlib
+import io
+from os import linesep, path
+from time import perf_counter
+
+from bagit_manifest import read_manifest
+
+
+def make_manifest(lines, algorithm, newline):
+    """Builds a manifest of the given number of lines, with a few paths that need percent-encoding."""
+    out = io.BytesIO()
+    for n in range(lines):
+        digest = hashlib.new(algorithm, str(n).encode()).hexdigest()
+        name = f'data/DisseminatedContent/batch_{n // 1000:05d}/file {n} 100%25.tif' if n % 97 == 0 else \
+            f'data/DisseminatedContent/batch_{n // 1000:05d}/file_{n}.tif'
+        out.write(f'{digest}  {name}{newline}'.encode('utf-8'))
+    return out.getvalue()
+
+
+def old_parse(data):
+    """The loop bag_sums used in check_sums 1.0.1-1.0.4, returning (basename, digest) pairs."""
+    records = []
+    for line in codecs.getreader("utf-8")(io.BytesIO(data)):
+        row = []
+        for thing in line.split('  '):  # The delimiter is a double-space
+            if not thing == '':
+                row.append(thing)
+        records.append((path.basename(row[1]).split(linesep)[0], row[0]))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time BagIt manifest parsing, line by line and with bagit_manifest.")
+    parser.add_argument("-n", '--lines', type=int, default=1000000, help="Lines per manifest (default: 1000000)")
+    args = parser.parse_args()
+    for algorithm in ('md5', 'sha512'):
+        for newline in ('\n', '\r\n'):
+            data = make_manifest(args.lines, algorithm, newline)
+            started = perf_counter()
+            old = old_parse(data)
+            old_time = perf_counter() - started
+            started = perf_counter()
+            new = list(read_manifest(io.BytesIO(data), algorithm))
+            new_time = perf_counter() - started
+            # The old loop neither decodes %25 nor strips a CR, so compare where it could be right
+            differ = sum(1 for (o_name, o_sum), (n_path, n_sum) in zip(old, new)
+                         if '%' not in n_path and newline == '\n' and (o_name, o_sum) != (path.basename(n_path), n_sum))
+            print(f'{algorithm} {newline.encode("unicode_escape").decode()} {len(data) / 2 ** 20:.0f} MB, '
+                  f'{len(new)} records: line by line {old_time:.2f} s, bagit_manifest {new_time:.2f} s '
+                  f'({old_time / new_time:.1f}x), {differ} mismatched')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""The inventory, checksum and comparison tools as one installable package. See cli.py for the commands."""
@@ -0,0 +1,68 @@
+"""Console entry points for the installed tools. Each one puts its tool's folder on sys.path and imports only that
+tool's script, so a call pays only for the modules that tool uses.
+"""
+
+import sys
+from importlib import import_module
+from os.path import dirname, isdir, join
+
+# Command: (folder, module, function)
+TOOLS = {
+    'cli-inventory': ('CLIinventory', 'CLIinventory', 'main'),
+    'inventory-only-tars': ('CLIinventory', 'InventoryOnlyTars', 'main'),
+    'audit-inventory': ('CLIinventory', 'audit_inventory', 'main'),
+    'verify-blocks': ('CLIinventory', 'verify_blocks', 'main'),
+    'merge-inventories': ('CLIinventory', 'merge_inventories', 'main'),
+    'check-inventories': ('check_inventories', 'check_inventories', 'main'),
+    'check-sums': ('check_the_sums', 'bag_validation', 'main'),
+    'bag-service': ('check_the_sums', 'bag_service', 'main'),
+    'trans-mani': ('trans_mani', 'trans_mani', 'cli'),
+}
+
+
+def tool_dir(folder):
+    """The folder of a tool: inside the package once installed, next to it in a source checkout."""
+    installed = join(dirname(__file__), folder)
+    return installed if isdir(installed) else join(dirname(dirname(__file__)), folder)
+
+
+def run(command):
+    folder, module, function = TOOLS[command]
+    sys.path.insert(0, tool_dir(folder))
+    return getattr(import_module(module), function)()
+
+
+def cli_inventory():
+    return run('cli-inventory')
+
+
+def inventory_only_tars():
+    return run('inventory-only-tars')
+
+
+def audit_inventory():
+    return run('audit-inventory')
+
+
+def verify_blocks():
+    return run('verify-blocks')
+
+
+def merge_inventories():
+    return run('merge-inventories')
+
+
+def check_inventories():
+    return run('check-inventories')
+
+
+def check_sums():
+    return run('check-sums')
+
+
+def bag_service():
+    return run('bag-service')
+
+
+def trans_mani():
+    return run('trans-mani')
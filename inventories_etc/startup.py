@@ -0,0 +1,43 @@
+"""Startup budget for the tools. Imports each tool's script in a fresh interpreter with -X importtime, takes the
+best of a few runs, and compares its cumulative import time with the budget. Exits with status 1 if any tool is
+over budget, so it can be run as a check before a release.
+"""
+
+import argparse
+import subprocess
+import sys
+
+from .cli import TOOLS, tool_dir
+
+BUDGET_MS = 50  # Import time allowed per tool, on top of the interpreter's own startup
+
+
+def import_time(folder, module):
+    """Microseconds spent importing a tool's module, as reported by -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=tool_dir(folder),
+                            capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2] == f' {module}':  # The top-level import is indented by one space
+            return int(fields[1])
+    raise ValueError(f'No import time reported for {module}.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of each tool against a startup budget.")
+    parser.add_argument('--budget', type=float, default=BUDGET_MS,
+                        help=f"Milliseconds of import time allowed per tool (default: {BUDGET_MS})")
+    parser.add_argument("-r", '--repeat', type=int, default=5, help="Runs per tool; the best is kept (default: 5)")
+    args = parser.parse_args()
+    over = 0
+    for command, (folder, module, _) in TOOLS.items():
+        best = min(import_time(folder, module) for _ in range(args.repeat)) / 1000
+        status = 'ok' if best <= args.budget else 'OVER BUDGET'
+        over += best > args.budget
+        print(f'{command:>20}: {best:6.1f} ms  {status}')
+    print(f'{over} of {len(TOOLS)} tools over the {args.budget:g} ms budget.')
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,34 +7,57 @@ Script to create a transfer manifest as a CSV list of files and checksums.
 import argparse
 import io
 import hashlib
+import sys
+from collections import Counter
 from time import strftime
-from os import getcwd, path, remove, walk
+from os import getcwd, path, remove
 
+# The throttle and walk filters are shared with CLIinventory, which sits next to this folder
+sys.path.append(path.join(path.dirname(path.abspath(__file__)), '..', 'CLIinventory'))
+from throttle import add_throttle_arguments, throttle_from_args
+from walk_filters import WalkFilter, add_filter_arguments, filter_from_args
 
-def sha3_hash(filname):
+
+def sha3_hash(filname, throttle=None):
     """ Generate SHA3-256 hashes. """
     chunksize = io.DEFAULT_BUFFER_SIZE
     hash_sha3 = hashlib.sha3_256()
+    if throttle:
+        throttle.start_file()
     with open(filname, "rb") as sha3file:
         for chunks in iter(lambda: sha3file.read(chunksize), b""):
+            if throttle:
+                throttle.consume(len(chunks))
             hash_sha3.update(chunks)
     return hash_sha3.hexdigest()
 
 
-def main(indir):
+def remove_ds_store(pathname, rule=None):
+    """ Delete .DS_Store files, so they aren't transferred. Returns whether
+    pathname was one. """
+    if path.basename(pathname) == '.DS_Store':
+        remove(pathname)
+        return True
+    return False
+
+
+def main(indir, throttle=None, walk_filter=None, skipped=None):
+    """ Write the manifest of the files in indir that walk_filter keeps (by
+    default, all of them), counting the ones it skips in skipped. .DS_Store files
+    are always deleted, whatever the rules. """
     num_files = 0
     outdir = getcwd()
     compfile = open(path.join(outdir, f'Transfer_{path.basename(indir)}_{strftime("%m%d_%H%M%S")}.csv'), 'w')
     sums = []
-    for base, dirs, files in walk(indir):
+    walk_filter = walk_filter or WalkFilter(excludes=())
+    for base, dirs, files in walk_filter.walk(indir, Counter() if skipped is None else skipped, remove_ds_store):
         for name in files:
             pathname = path.join(base, name)
-            if path.basename(pathname) == '.DS_Store':
-                remove(pathname)
-            elif not path.basename(pathname) == '.DS_Store':
-                sha3sum = sha3_hash(pathname)
-                sums.append([name,sha3sum])
-                num_files += 1
+            if remove_ds_store(pathname):
+                continue
+            sha3sum = sha3_hash(pathname, throttle)
+            sums.append([name,sha3sum])
+            num_files += 1
     sums.sort()
     for r in sums:
         compfile.write(f"{r[0]},{r[1]}\n")
@@ -42,13 +65,27 @@ def main(indir):
     return num_files
 
 
-if __name__ == "__main__":
+def cli():
+    """ Command-line entry point. """
     parser = argparse.ArgumentParser(description="Generate checksum hashes for all files in given directory.")
     parser.add_argument("dir_path", type=str, help="Path to input directory")
+    add_throttle_arguments(parser)
+    add_filter_arguments(parser, default_excludes=False)
     args = parser.parse_args()
     in_dir = args.dir_path
     if path.exists(in_dir):
-        no_items = main(in_dir)
+        throttle = throttle_from_args(args)
+        walk_filter = filter_from_args(args)
+        skipped = Counter()
+        no_items = main(in_dir, throttle, walk_filter, skipped)
         print(f"Checksummed {no_items} items.")
+        for line in walk_filter.report(skipped):
+            print(line)
+        if throttle:
+            print(throttle.summary())
     else:
         print("Error. Folder not found.")
+
+
+if __name__ == "__main__":
+    cli()